@@ -0,0 +1,61 @@
+# chart.py
+from matplotlib import style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+def to_rgb(color):
+    """Convert a 0-255 color tuple to matplotlib's 0-1 range"""
+    return tuple(c / 255 for c in color[:3])
+
+
+#Wykres statystyk populacji renderowany do bufora RGBA
+class PopulationChart:
+    SERIES = (('healthy', 'Healthy'), ('infected', 'Infected'), ('immune', 'Immune'))
+
+    def __init__(self, colors):
+        """
+        Build the figure once; later renders only replace the plotted data.
+
+        Args:
+            colors (dict): Color palette of the application (0-255 tuples)
+        """
+        # Style is applied while the artists are created, without touching global state
+        with style.context('seaborn-v0_8-whitegrid'):
+            self.figure = Figure(figsize=(4, 3), dpi=80)
+            self.canvas = FigureCanvasAgg(self.figure)
+            self.figure.patch.set_facecolor(to_rgb(colors['chart_bg']))
+            ax = self.figure.add_subplot()
+            ax.set_facecolor(to_rgb(colors['chart_bg']))
+
+            self.lines = {}
+            for name, label in self.SERIES:
+                self.lines[name], = ax.plot([], [], '-', color=to_rgb(colors[name]), linewidth=3, label=label)
+
+            ax.set_title('Population Statistics', fontweight='bold', color=to_rgb(colors['text_primary']))
+            ax.set_xlabel('Time (s)', color=to_rgb(colors['text_secondary']))
+            ax.set_ylabel('Count', color=to_rgb(colors['text_secondary']))
+            ax.tick_params(colors=to_rgb(colors['text_secondary']))
+
+            # Modern legend
+            legend = ax.legend(loc='upper right', framealpha=0.8)
+            frame = legend.get_frame()
+            frame.set_facecolor('white')
+            frame.set_edgecolor(to_rgb(colors['panel_border']))
+
+            ax.grid(True, linestyle='--', alpha=0.7, color=to_rgb(colors['grid']))
+        self.axes = ax
+
+    def render(self, history):
+        """
+        Draw the history and return the image.
+
+        Returns:
+            tuple: (RGBA bytes, (width, height))
+        """
+        for name, line in self.lines.items():
+            line.set_data(history['time'], history[name])
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.canvas.draw()
+        return bytes(self.canvas.buffer_rgba()), self.canvas.get_width_height()
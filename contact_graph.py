@@ -0,0 +1,276 @@
+# contact_graph.py
+import math
+import heapq
+from array import array
+
+
+#Graf kontaktów i łańcuchów zakażeń budowany przyrostowo podczas symulacji
+class ContactGraph:
+    def __init__(self, compact_threshold=4096):
+        """
+        Initialize an empty contact/transmission graph.
+
+        Contacts are edges from an infected person to a healthy person who
+        spent time close to them, weighted by the exposure time. They are
+        appended to flat arrays and periodically compacted into a CSR index
+        by infected person, so lookups never scan the whole history.
+
+        Args:
+            compact_threshold (int): Minimum number of new contacts before compaction
+        """
+        self.time = 0.0  # Current simulation time, set by the simulation every update
+        self.compact_threshold = compact_threshold
+
+        # Dense node numbering for person IDs
+        self._node_index = {}
+        self._node_ids = array('q')
+
+        # Append-only contact log
+        self._sources = array('q')  # Node of the infected person
+        self._targets = array('q')  # Node of the exposed person
+        self._durations = array('d')  # Exposure time in seconds
+        self._ended_at = array('d')  # Simulation time the contact ended
+
+        # CSR index over the compacted part of the log, by source node
+        self._indptr = array('q', [0])
+        self._edges = array('q')
+        self._compacted = 0
+        self._pending = {}  # Source node -> edges appended since the last compaction
+
+        # Contacts still going on, so they can be recorded however they end
+        self._open = {}  # (infected ID, exposed ID) -> exposure time so far
+        self._open_by = {}  # Person ID -> keys of _open the person takes part in
+
+        # Transmission tree, kept up to date as infections happen
+        self.infected_at = {}  # Person ID -> infection time
+        self.infector_of = {}  # Person ID -> infector ID (index cases have none)
+        self.secondary_cases = {}  # Infector ID -> number of people they infected
+        self.generation_intervals = array('d')
+        self.transmission_distances = array('d')
+
+    def _node(self, person_id):
+        node = self._node_index.get(person_id)
+        if node is None:
+            node = len(self._node_ids)
+            self._node_index[person_id] = node
+            self._node_ids.append(person_id)
+        return node
+
+    def record_infection(self, person_id):
+        """Record that a person became infected now (index cases only get this call)"""
+        self.infected_at[person_id] = self.time
+
+    def open_contact(self, infected_id, exposed_id, duration):
+        """Update the exposure time of a contact that is still going on"""
+        key = (infected_id, exposed_id)
+        if key not in self._open:
+            self._open_by.setdefault(infected_id, set()).add(key)
+            self._open_by.setdefault(exposed_id, set()).add(key)
+        self._open[key] = duration
+
+    def _close_contact(self, key):
+        duration = self._open.pop(key, None)
+        if duration is not None:
+            for person_id in key:
+                keys = self._open_by[person_id]
+                keys.discard(key)
+                if not keys:
+                    del self._open_by[person_id]
+        return duration
+
+    def end_contacts(self, person_id):
+        """
+        Record every contact a person takes part in as finished.
+
+        Called when the exposure ends for another reason than the people moving
+        apart: either of them changes state or leaves the simulation.
+        """
+        for key in sorted(self._open_by.get(person_id, ())):
+            duration = self._close_contact(key)
+            if duration > 0:
+                self.record_contact(key[0], key[1], duration)
+
+    def record_contact(self, infected_id, exposed_id, duration):
+        """Record a finished period of close contact between an infected and a healthy person"""
+        self._close_contact((infected_id, exposed_id))
+        source = self._node(infected_id)
+        edge = len(self._sources)
+        self._sources.append(source)
+        self._targets.append(self._node(exposed_id))
+        self._durations.append(duration)
+        self._ended_at.append(self.time)
+        self._pending.setdefault(source, []).append(edge)
+        if edge + 1 - self._compacted >= max(self.compact_threshold, self._compacted // 4):
+            self.compact()
+
+    def record_transmission(self, infector_id, infectee_id, distance, exposure):
+        """
+        Record that one person infected another.
+
+        Args:
+            infector_id (int): ID of the infected person
+            infectee_id (int): ID of the newly infected person
+            distance (float): Distance between them at the moment of infection
+            exposure (float): Time they had spent close to each other
+        """
+        self.infector_of[infectee_id] = infector_id
+        self.secondary_cases[infector_id] = self.secondary_cases.get(infector_id, 0) + 1
+        self.transmission_distances.append(distance)
+        if infector_id in self.infected_at:
+            self.generation_intervals.append(self.time - self.infected_at[infector_id])
+        self.record_contact(infector_id, infectee_id, exposure)
+
+    def compact(self):
+        """Merge the contacts recorded since the last compaction into the CSR index"""
+        if not self._pending:
+            return
+        nodes = len(self._node_ids)
+        old_indptr, old_edges = self._indptr, self._edges
+        old_nodes = len(old_indptr) - 1
+        indptr = array('q', [0]) * (nodes + 1)
+        edges = array('q', [0]) * len(self._sources)
+        position = 0
+        for node in range(nodes):
+            indptr[node] = position
+            if node < old_nodes:
+                start, end = old_indptr[node], old_indptr[node + 1]
+                edges[position:position + end - start] = old_edges[start:end]
+                position += end - start
+            pending = self._pending.get(node)
+            if pending:
+                edges[position:position + len(pending)] = array('q', pending)
+                position += len(pending)
+        indptr[nodes] = position
+        self._indptr, self._edges = indptr, edges
+        self._compacted = len(self._sources)
+        self._pending = {}
+
+    def _edges_of(self, person_id):
+        node = self._node_index.get(person_id)
+        if node is None:
+            return []
+        edges = []
+        if node < len(self._indptr) - 1:
+            edges.extend(self._edges[self._indptr[node]:self._indptr[node + 1]])
+        edges.extend(self._pending.get(node, ()))
+        return edges
+
+    def contacts_of(self, person_id):
+        """
+        Return the close contacts a person had while infected.
+
+        Returns:
+            list: (exposed person ID, exposure time, time the contact ended) tuples
+        """
+        return [(self._node_ids[self._targets[edge]], self._durations[edge], self._ended_at[edge])
+                for edge in self._edges_of(person_id)]
+
+    def contact_count(self):
+        return len(self._sources)
+
+    def infection_chain(self, person_id):
+        """Return the IDs from a person back to the index case that started their chain"""
+        chain = [person_id]
+        while chain[-1] in self.infector_of:
+            chain.append(self.infector_of[chain[-1]])
+        return chain
+
+    def mean_secondary_cases(self):
+        """Average number of people infected per infected person (index cases included)"""
+        if not self.infected_at:
+            return 0.0
+        return sum(self.secondary_cases.values()) / len(self.infected_at)
+
+    def mean_generation_interval(self):
+        if not self.generation_intervals:
+            return 0.0
+        return sum(self.generation_intervals) / len(self.generation_intervals)
+
+    def super_spreaders(self, min_cases=None, top=None):
+        """
+        Return the people who caused the most infections.
+
+        Args:
+            min_cases (int): Secondary cases needed to count as a super-spreader;
+                by default the 99th percentile over all infected people (at least 2)
+            top (int): Return at most this many, largest first
+
+        Returns:
+            list: (person ID, secondary cases) tuples, largest first
+        """
+        if min_cases is None:
+            counts = sorted(self.secondary_cases.values())
+            zeros = max(len(self.infected_at) - len(counts), 0)
+            total = zeros + len(counts)
+            rank = math.ceil(0.99 * total) - 1 - zeros
+            min_cases = max(2, counts[rank] if 0 <= rank < len(counts) else 0)
+        spreaders = [(person_id, cases) for person_id, cases in self.secondary_cases.items() if cases >= min_cases]
+        if top is not None:
+            return heapq.nlargest(top, spreaders, key=lambda item: item[1])
+        return sorted(spreaders, key=lambda item: item[1], reverse=True)
+
+    def branch(self):
+        """
+        Return the graph for a forked simulation.
+
+        The branch keeps the transmission tree and the contacts still going on,
+        but starts an empty contact log.
+        """
+        graph = ContactGraph(self.compact_threshold)
+        graph.time = self.time
+        graph.infected_at = dict(self.infected_at)
+        graph.infector_of = dict(self.infector_of)
+        graph.secondary_cases = dict(self.secondary_cases)
+        graph.generation_intervals = array('d', self.generation_intervals)
+        graph.transmission_distances = array('d', self.transmission_distances)
+        graph._open = dict(self._open)
+        graph._open_by = {person_id: set(keys) for person_id, keys in self._open_by.items()}
+        return graph
+
+    def checkpoint(self):
+        """Return what rollback() needs to bring the graph back to this moment"""
+        return {
+            'time': self.time,
+            'nodes': len(self._node_ids),
+            'contacts': len(self._sources),
+            'infected_at': dict(self.infected_at),
+            'infector_of': dict(self.infector_of),
+            'secondary_cases': dict(self.secondary_cases),
+            'transmissions': len(self.transmission_distances),
+            'generations': len(self.generation_intervals),
+            'open': dict(self._open),
+        }
+
+    def rollback(self, checkpoint):
+        """Forget everything recorded after a checkpoint of this graph was taken"""
+        self.time = checkpoint['time']
+        nodes, contacts = checkpoint['nodes'], checkpoint['contacts']
+        for person_id in self._node_ids[nodes:]:
+            del self._node_index[person_id]
+        del self._node_ids[nodes:]
+        for log in (self._sources, self._targets, self._durations, self._ended_at):
+            del log[contacts:]
+
+        if contacts < self._compacted:
+            # Part of the compacted index is gone: rebuild it from the log
+            self._indptr, self._edges, self._compacted = array('q', [0]), array('q'), 0
+            self._pending = {}
+            for edge, source in enumerate(self._sources):
+                self._pending.setdefault(source, []).append(edge)
+            self.compact()
+        else:
+            pending = {}
+            for source, edges in self._pending.items():
+                edges = [edge for edge in edges if edge < contacts]
+                if edges:
+                    pending[source] = edges
+            self._pending = pending
+
+        self.infected_at = dict(checkpoint['infected_at'])
+        self.infector_of = dict(checkpoint['infector_of'])
+        self.secondary_cases = dict(checkpoint['secondary_cases'])
+        del self.transmission_distances[checkpoint['transmissions']:]
+        del self.generation_intervals[checkpoint['generations']:]
+        self._open, self._open_by = {}, {}
+        for (infected_id, exposed_id), duration in checkpoint['open'].items():
+            self.open_contact(infected_id, exposed_id, duration)
@@ -0,0 +1,293 @@
+# equivalence.py
+import sys
+import math
+import argparse
+import importlib
+from person import Person
+from simulation import Simulation
+from models.Vector2D import Vector2D
+from helpers import map_jobs
+from constants import INFECTED_STATE
+
+# Scenario every seed is run with, matching the defaults of main.py
+DEFAULT_SCENARIO = {
+    'area_width': 50,
+    'area_height': 50,
+    'initial_population': 100,
+    'immune_rate': 0.1,
+    'initial_infected': 5,
+}
+
+METRICS = ('peak_infected', 'peak_time', 'attack_rate')
+
+
+#Pierwotna pętla "każdy z każdym", zamrożona jako wzorzec dla szybszych implementacji
+class ReferenceSimulation(Simulation):
+    """
+    The original update loop, area bounds and arrivals, kept as they were.
+
+    Only the population setup and the people's own behaviour (Person and the
+    state classes) come from the live code; everything a faster Simulation
+    may rewrite is frozen here, drawing from the simulation's random stream.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.spawn_flux is not None:
+            raise ValueError("ReferenceSimulation only has the original spawn_rate arrivals")
+
+    def update(self):
+        """Update the simulation state for one time step, checking every pair of people"""
+        if self.contact_graph is not None:
+            self.contact_graph.time = self.time
+        for person in self.persons[:]:  # Copy list to be able to remove people
+            person.move(self.delta_time)
+            person.update_state(self.delta_time)
+
+            # Check interactions with other people
+            for other_person in self.persons:
+                if other_person.id == person.id:
+                    continue  # Don't check interaction with self
+                person.interact(other_person, self.delta_time)
+
+            # Check area boundaries
+            self.check_bounds(person)
+
+        # Add new people occasionally if below max population
+        below_limit = self.max_population is None or len(self.persons) < self.max_population
+        if below_limit and self.rng.random() < self.spawn_rate:
+            self.spawn_person()
+
+    def check_bounds(self, person):
+        """Check if a person is within the bounds of the simulation area"""
+        x, y = person.position.x, person.position.y
+        left, right = 0, self.area_width
+        top, bottom = 0, self.area_height
+
+        out_of_bounds = False
+        if x < left:
+            out_of_bounds = True
+        elif x > right:
+            out_of_bounds = True
+        if y < top:
+            out_of_bounds = True
+        elif y > bottom:
+            out_of_bounds = True
+
+        if out_of_bounds:
+            if self.rng.random() < 0.7:  # 70% chance to bounce back
+                # Reflect velocity to stay in bounds
+                if x < left or x > right:
+                    person.velocity.x *= -1
+                if y < top or y > bottom:
+                    person.velocity.y *= -1
+
+                # Correct position to be within bounds
+                person.position.x = max(min(person.position.x, right), left)
+                person.position.y = max(min(person.position.y, bottom), top)
+            else:
+                # Remove person from simulation (30% chance)
+                self.persons.remove(person)
+                del self.persons_by_id[person.id]
+
+    def spawn_person(self):
+        """Generate a new person at the border of the simulation area"""
+        # Random position on the border
+        side = self.rng.choice(['left', 'right', 'top', 'bottom'])
+        if side == 'left':
+            position = Vector2D(0, self.rng.uniform(0, self.area_height))
+            velocity_direction = Vector2D(1, self.rng.uniform(-0.5, 0.5))
+        elif side == 'right':
+            position = Vector2D(self.area_width, self.rng.uniform(0, self.area_height))
+            velocity_direction = Vector2D(-1, self.rng.uniform(-0.5, 0.5))
+        elif side == 'top':
+            position = Vector2D(self.rng.uniform(0, self.area_width), 0)
+            velocity_direction = Vector2D(self.rng.uniform(-0.5, 0.5), 1)
+        else:  # bottom
+            position = Vector2D(self.rng.uniform(0, self.area_width), self.area_height)
+            velocity_direction = Vector2D(self.rng.uniform(-0.5, 0.5), -1)
+
+        # Create new person with velocity pointing inward
+        person = Person(position, velocity_direction=velocity_direction, rng=self.rng)
+
+        # 10% chance of being infected when entering
+        if self.rng.random() < 0.1:
+            person.change_state(INFECTED_STATE)
+
+        self.persons.append(person)
+        self.persons_by_id[person.id] = person
+
+
+def load_backend(spec):
+    """Import a Simulation subclass given as 'module:ClassName'"""
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name or 'Simulation')
+
+
+def trajectory_signature(simulation):
+    """Return everything the reference loop determines, apart from the global person IDs"""
+    return [
+        (person.position.x, person.position.y, person.velocity.x, person.velocity.y,
+         person.state.__class__.__name__, person.has_symptoms)
+        for person in simulation.persons
+    ]
+
+
+def _epidemic_metrics(curve, ever_infected, ever_present, delta_time):
+    peak_infected = max(curve)
+    return {
+        'peak_infected': peak_infected,
+        'peak_time': curve.index(peak_infected) * delta_time,
+        'attack_rate': len(ever_infected) / max(len(ever_present), 1),
+    }
+
+
+def _run_seed(args):
+    """Run the reference and the candidate for one seed and summarize both"""
+    backend, seed, steps, scenario, exact = args
+    reference = ReferenceSimulation(seed=seed, **scenario)
+    candidate = backend(seed=seed, **scenario)
+
+    results = []
+    first_divergence = None
+    tracking = [(reference, [], set(), set()), (candidate, [], set(), set())]
+    for step in range(steps + 1):
+        if step:
+            reference.step()
+            candidate.step()
+        for simulation, curve, ever_infected, ever_present in tracking:
+            infected = 0
+            for person in simulation.persons:
+                ever_present.add(person.id)
+                if person.state.__class__.__name__ == INFECTED_STATE:
+                    infected += 1
+                    ever_infected.add(person.id)
+            curve.append(infected)
+        if exact and first_divergence is None and \
+                trajectory_signature(reference) != trajectory_signature(candidate):
+            first_divergence = step
+
+    for simulation, curve, ever_infected, ever_present in tracking:
+        results.append(_epidemic_metrics(curve, ever_infected, ever_present, simulation.delta_time))
+    return {'seed': seed, 'reference': results[0], 'candidate': results[1],
+            'first_divergence': first_divergence}
+
+
+def ks_2samp(sample_a, sample_b):
+    """
+    Two-sample Kolmogorov-Smirnov test.
+
+    Returns:
+        tuple: (statistic, p_value) with the asymptotic p-value
+    """
+    a, b = sorted(sample_a), sorted(sample_b)
+    n, m = len(a), len(b)
+    i = j = 0
+    statistic = 0.0
+    while i < n and j < m:
+        value = min(a[i], b[j])
+        while i < n and a[i] == value:
+            i += 1
+        while j < m and b[j] == value:
+            j += 1
+        statistic = max(statistic, abs(i / n - j / m))
+    if statistic == 0.0:
+        return 0.0, 1.0
+
+    effective = math.sqrt(n * m / (n + m))
+    lam = (effective + 0.12 + 0.11 / effective) * statistic
+    p_value = 2 * sum((-1) ** (k - 1) * math.exp(-2 * (k * lam) ** 2) for k in range(1, 101))
+    return statistic, max(0.0, min(1.0, p_value))
+
+
+def compare(backend, seeds=range(32), steps=1800, scenario=None, exact=True, alpha=0.01, max_workers=None):
+    """
+    Check that a candidate backend reproduces the reference dynamics.
+
+    Every seed runs ReferenceSimulation (the original all-pairs loop) and the
+    candidate side by side; Simulation itself is checked like any other backend.
+    With exact=True the trajectories must also match step by step, which only
+    holds when the candidate draws from the random stream in the same order.
+    The distributions of the epidemic metrics over all seeds are always
+    compared with a two-sample Kolmogorov-Smirnov test.
+
+    Args:
+        backend (type): Simulation subclass (or 'module:ClassName') to check
+        seeds (iterable): Seeds to run
+        steps (int): Time steps per run
+        scenario (dict): Overrides of DEFAULT_SCENARIO
+        exact (bool): Also compare the trajectories step by step
+        alpha (float): Significance level of the distribution tests
+        max_workers (int): Worker processes to use; 0 runs in this process
+
+    Returns:
+        dict: 'passed', per-metric test results, exact-match counts and per-seed runs
+    """
+    if isinstance(backend, str):
+        backend = load_backend(backend)
+    scenario = dict(DEFAULT_SCENARIO, **(scenario or {}))
+    jobs = [(backend, seed, steps, scenario, exact) for seed in seeds]
+    runs = map_jobs(_run_seed, jobs, max_workers)
+
+    tests = {}
+    for metric in METRICS:
+        reference = [run['reference'][metric] for run in runs]
+        candidate = [run['candidate'][metric] for run in runs]
+        statistic, p_value = ks_2samp(reference, candidate)
+        tests[metric] = {
+            'reference_mean': sum(reference) / len(reference),
+            'candidate_mean': sum(candidate) / len(candidate),
+            'statistic': statistic,
+            'p_value': p_value,
+            'passed': p_value >= alpha,
+        }
+
+    passed = all(test['passed'] for test in tests.values())
+    exact_matches = None
+    if exact:
+        exact_matches = sum(1 for run in runs if run['first_divergence'] is None)
+        passed = passed and exact_matches == len(runs)
+    return {
+        'passed': passed,
+        'tests': tests,
+        'exact_matches': exact_matches,
+        'runs': runs,
+    }
+
+
+def format_report(report):
+    """Return a human-readable summary of a compare() result"""
+    lines = []
+    for metric, test in report['tests'].items():
+        lines.append(
+            f"{metric:>14}: reference {test['reference_mean']:.3f}, candidate {test['candidate_mean']:.3f}, "
+            f"KS {test['statistic']:.3f} (p={test['p_value']:.3f}) {'ok' if test['passed'] else 'FAILED'}"
+        )
+    if report['exact_matches'] is not None:
+        divergences = [run['first_divergence'] for run in report['runs'] if run['first_divergence'] is not None]
+        line = f"Exact trajectories: {report['exact_matches']}/{len(report['runs'])} seeds"
+        if divergences:
+            line += f" (earliest divergence at step {min(divergences)})"
+        lines.append(line)
+    lines.append("PASSED" if report['passed'] else "FAILED")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a Simulation backend against the all-pairs reference loop.")
+    parser.add_argument('backend', help="Simulation subclass to check, as module:ClassName")
+    parser.add_argument('--seeds', type=int, default=32, help="number of seeds to run")
+    parser.add_argument('--steps', type=int, default=1800, help="time steps per run")
+    parser.add_argument('--alpha', type=float, default=0.01, help="significance level")
+    parser.add_argument('--no-exact', action='store_true', help="skip the step-by-step comparison (for backends that use the random stream differently)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (0 runs serially)")
+    args = parser.parse_args()
+
+    report = compare(args.backend, seeds=range(args.seeds), steps=args.steps, exact=not args.no_exact,
+                     alpha=args.alpha, max_workers=args.workers)
+    print(format_report(report))
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# helpers.py
+from concurrent.futures import ProcessPoolExecutor
+from constants import HEALTHY_STATE, INFECTED_STATE, IMMUNE_STATE
+
+
+def count_states(simulation):
+    """Return the number of healthy, infected and immune people in a simulation"""
+    counts = {HEALTHY_STATE: 0, INFECTED_STATE: 0, IMMUNE_STATE: 0}
+    for person in simulation.persons:
+        counts[person.state.__class__.__name__] += 1
+    return counts
+
+
+def map_jobs(function, jobs, max_workers=None, initializer=None, initargs=()):
+    """
+    Apply a function to every job, in worker processes unless max_workers is 0.
+
+    Args:
+        function (callable): Module-level function taking one job
+        jobs (iterable): Arguments for the function, one per call
+        max_workers (int): Worker processes to use; 0 runs in this process
+        initializer (callable): Called once per worker (or once here) before the jobs
+        initargs (tuple): Arguments for the initializer
+
+    Returns:
+        list: The results, in the same order as the jobs
+    """
+    if max_workers == 0:
+        if initializer is not None:
+            initializer(*initargs)
+        return [function(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs) as executor:
+        return list(executor.map(function, jobs))
@@ -1,9 +1,10 @@
+import time
+STARTED_AT = time.perf_counter()  # Reference point for the time-to-first-frame report
+
 import pygame
 import sys
+import argparse
 from simulation import Simulation
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-import numpy as np
 from pygame import gfxdraw
 
 # Define a modern color palette
@@ -42,7 +43,23 @@ def draw_rounded_rect(surface, color, rect, radius=10, border=0, border_color=No
         border_radius=radius
     )
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Disease Spread Simulation")
+    parser.add_argument('--width', type=float, default=50, help="width of the simulation area")
+    parser.add_argument('--height', type=float, default=50, help="height of the simulation area")
+    parser.add_argument('--population', type=int, default=100, help="initial number of people")
+    parser.add_argument('--immune-rate', type=float, default=0.1, help="fraction of initially immune people")
+    parser.add_argument('--infected', type=int, default=5, help="number of initially infected people")
+    parser.add_argument('--max-population', type=int, default=300, help="population limit for arrivals (0 for no limit)")
+    parser.add_argument('--spawn-flux', type=float, default=None,
+                        help="arrivals per unit of border length per second (default: one chance per frame)")
+    parser.add_argument('--seed', type=int, default=None, help="random seed")
+    parser.add_argument('--no-chart', action='store_true', help="skip the statistics chart (matplotlib is not loaded)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+
     # Window setup
     pygame.init()
     window_width, window_height = 1000, 700
@@ -51,7 +68,7 @@ def main():
     clock = pygame.time.Clock()
 
     # Simulation area is smaller than the window
-    sim_area_width, sim_area_height = 50, 50
+    sim_area_width, sim_area_height = args.width, args.height
     display_area_width, display_area_height = 500, 500  # Size for displaying the simulation
     sim_x_offset = 20
     sim_y_offset = 100
@@ -63,16 +80,22 @@ def main():
     
     # Statistics tracking
     history = {'healthy': [], 'infected': [], 'immune': [], 'time': []}
+    chart = None  # Chart backend is loaded on the first render
     chart_surface = None
     chart_update_interval = 1.0  # Update chart every second
     time_since_chart_update = 0.0
     
     # Simulation parameters
-    initial_population = 100
-    immune_rate = 0.1
-    initial_infected = 5
+    initial_population = args.population
+    immune_rate = args.immune_rate
+    initial_infected = args.infected
+    world = {
+        'seed': args.seed,
+        'max_population': args.max_population or None,
+        'spawn_flux': args.spawn_flux,
+    }
     simulation = Simulation(sim_area_width, sim_area_height, initial_population, 
-                           immune_rate=immune_rate, initial_infected=initial_infected)
+                           immune_rate=immune_rate, initial_infected=initial_infected, **world)
     
     saved_states = []
     running = True
@@ -91,42 +114,24 @@ def main():
         main_font = pygame.font.SysFont(None, 24)
         small_font = pygame.font.SysFont(None, 18)
     
+    # Text that never changes is rendered once
+    title = title_font.render("Disease Spread Simulation", True, COLORS['text_primary'])
+    stats_title = main_font.render("Statistics", True, (255, 255, 255))
+    hint = small_font.render("Press H for help", True, COLORS['text_secondary'])
+
     def update_chart():
-        nonlocal chart_surface
-        # Create a figure with a modern style
-        plt.style.use('seaborn-v0_8-whitegrid')
-        fig, ax = plt.subplots(figsize=(4, 3), dpi=80)
-        fig.patch.set_facecolor(tuple(c/255 for c in COLORS['chart_bg']))
-        ax.set_facecolor(tuple(c/255 for c in COLORS['chart_bg']))
-        
-        times = history['time']
-        ax.plot(times, history['healthy'], '-', color=tuple(c/255 for c in COLORS['healthy']), linewidth=3, label='Healthy')
-        ax.plot(times, history['infected'], '-', color=tuple(c/255 for c in COLORS['infected']), linewidth=3, label='Infected')
-        ax.plot(times, history['immune'], '-', color=tuple(c/255 for c in COLORS['immune']), linewidth=3, label='Immune')
-        
-        ax.set_title('Population Statistics', fontweight='bold', color=tuple(c/255 for c in COLORS['text_primary']))
-        ax.set_xlabel('Time (s)', color=tuple(c/255 for c in COLORS['text_secondary']))
-        ax.set_ylabel('Count', color=tuple(c/255 for c in COLORS['text_secondary']))
-        ax.tick_params(colors=tuple(c/255 for c in COLORS['text_secondary']))
-        
-        # Modern legend
-        legend = ax.legend(loc='upper right', framealpha=0.8)
-        frame = legend.get_frame()
-        frame.set_facecolor('white')
-        frame.set_edgecolor(tuple(c/255 for c in COLORS['panel_border']))
-        
-        ax.grid(True, linestyle='--', alpha=0.7, color=tuple(c/255 for c in COLORS['grid']))
-        
-        # Convert matplotlib figure to pygame surface
-        canvas = FigureCanvasAgg(fig)
-        canvas.draw()
-        renderer = canvas.get_renderer()
-        buffer = renderer.buffer_rgba()
-        raw_data = bytes(buffer)
-        size = canvas.get_width_height()
+        nonlocal chart, chart_surface
+        if chart is None:
+            loading_started = time.perf_counter()
+            from chart import PopulationChart
+            chart = PopulationChart(COLORS)
+            print(f"Chart backend loaded in {(time.perf_counter() - loading_started) * 1000:.0f} ms")
+
+        # Convert the rendered chart to a pygame surface
+        raw_data, size = chart.render(history)
         chart_surface = pygame.image.fromstring(raw_data, size, "RGBA")
-        plt.close(fig)
     
+    first_frame = True
     while running:
         delta_time = clock.tick(simulation.frame_rate) / 1000.0
         
@@ -151,7 +156,7 @@ def main():
                 elif event.key == pygame.K_r:
                     # Reset simulation
                     simulation = Simulation(sim_area_width, sim_area_height, initial_population, 
-                                          immune_rate=immune_rate, initial_infected=initial_infected)
+                                          immune_rate=immune_rate, initial_infected=initial_infected, **world)
                     history = {'healthy': [], 'infected': [], 'immune': [], 'time': []}
                     chart_surface = None
         
@@ -172,7 +177,8 @@ def main():
                 history['immune'].append(immune_count)
                 history['time'].append(simulation.time)
                 
-                update_chart()
+                if not args.no_chart:
+                    update_chart()
                 time_since_chart_update = 0
                 
         # Clear screen with main background color
@@ -206,7 +212,6 @@ def main():
         )
         
         # Draw title with subtle shadow for depth
-        title = title_font.render("Disease Spread Simulation", True, COLORS['text_primary'])
         screen.blit(title, (window_width // 2 - title.get_width() // 2, 20))
         
         # Draw persons with improved visualization
@@ -263,7 +268,6 @@ def main():
             (header_rect[0], header_rect[1] + header_rect[3] - 15, header_rect[2], 15)
         )
         
-        stats_title = main_font.render("Statistics", True, (255, 255, 255))
         screen.blit(stats_title, (sidebar_x + 20, sim_y_offset + 10))
         
         healthy_count = sum(1 for p in simulation.persons if p.state.__class__.__name__ == 'HealthyState')
@@ -342,11 +346,13 @@ def main():
                 show_help = False
         else:
             # Enhanced help hint
-            hint = small_font.render("Press H for help", True, COLORS['text_secondary'])
             hint_rect = hint.get_rect(bottomright=(window_width - 10, window_height - 10))
             screen.blit(hint, hint_rect)
         
         pygame.display.flip()
+        if first_frame:
+            first_frame = False
+            print(f"Time to first frame: {(time.perf_counter() - STARTED_AT) * 1000:.0f} ms")
     
     pygame.quit()
     sys.exit()
@@ -0,0 +1,206 @@
+# metapopulation.py
+import random
+import multiprocessing
+from person import Person
+from simulation import Simulation
+from helpers import count_states
+from constants import HEALTHY_STATE, INFECTED_STATE, IMMUNE_STATE
+
+# Side a person leaves through -> (column offset, row offset, side of entry)
+NEIGHBOURS = {
+    'left': (-1, 0, 'right'),
+    'right': (1, 0, 'left'),
+    'top': (0, -1, 'bottom'),
+    'bottom': (0, 1, 'top'),
+}
+
+# Size of the ID range reserved for people created inside each worker process
+REGION_ID_BLOCK = 1 << 40
+
+
+def _synchronize(simulation, arrivals, steps):
+    """Admit arrivals, advance one synchronization interval and collect emigrants"""
+    for person, side in arrivals:
+        simulation.admit_person(person, side)
+    simulation.step(steps)
+    emigrants = simulation.emigrants
+    simulation.emigrants = []
+    return emigrants, count_states(simulation)
+
+
+def _region_worker(connection, simulation, id_base):
+    """Process loop that owns one region and answers synchronization requests"""
+    Person.next_id = max(Person.next_id, id_base)
+    while True:
+        command, payload = connection.recv()
+        if command == 'sync':
+            connection.send(_synchronize(simulation, *payload))
+        elif command == 'snapshot':
+            connection.send(simulation)
+        else:  # close
+            break
+    connection.close()
+
+
+class _LocalRegion:
+    """Region stepped in the calling process"""
+
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.result = None
+
+    def send(self, command, payload=None):
+        if command == 'sync':
+            self.result = _synchronize(self.simulation, *payload)
+        elif command == 'snapshot':
+            self.result = self.simulation
+
+    def receive(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class _ProcessRegion:
+    """Region owned by a dedicated worker process"""
+
+    def __init__(self, simulation, id_base):
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_region_worker, args=(child_connection, simulation, id_base), daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+
+    def send(self, command, payload=None):
+        self.connection.send((command, payload))
+
+    def receive(self):
+        return self.connection.recv()
+
+    def close(self):
+        if self.process.is_alive():
+            self.connection.send(('close', None))
+            self.process.join()
+        self.connection.close()
+
+
+#Miasto złożone z dzielnic, z których każda jest osobną symulacją
+class Metapopulation:
+    def __init__(self, columns, rows, region_width, region_height, population_per_region,
+                 immune_rate=0.0, initial_infected=0, sync_interval=30, parallel=True, seed=None,
+                 closed_border=True):
+        """
+        Initialize a grid of regions that exchange people at their shared borders.
+
+        Args:
+            columns (int): Number of regions horizontally
+            rows (int): Number of regions vertically
+            region_width (float): Width of every region
+            region_height (float): Height of every region
+            population_per_region (int): Initial number of people in each region
+            immune_rate (float): Percentage of initially immune people (0.0-1.0)
+            initial_infected (int): Number of initially infected people, spread over random regions
+            sync_interval (int): Time steps the regions run between migration exchanges
+            parallel (bool): Run every region in its own worker process
+            seed (int): Seed from which the regions' random streams are derived
+            closed_border (bool): Regions get no arrivals from outside the city, so
+                people who leave through the city's outer border are turned back
+                into the region they left, at the next synchronization. With False
+                they leave for good (counted in departed) and the city empties over time.
+        """
+        self.columns = columns
+        self.rows = rows
+        self.sync_interval = sync_interval
+        self.closed_border = closed_border
+        self.time = 0.0
+        self.rng = random.Random(seed)
+
+        infected_per_region = [0] * (columns * rows)
+        for _ in range(initial_infected):
+            infected_per_region[self.rng.randrange(columns * rows)] += 1
+
+        simulations = []
+        for index in range(columns * rows):
+            simulation = Simulation(region_width, region_height, population_per_region,
+                                    immune_rate=immune_rate, initial_infected=infected_per_region[index],
+                                    seed=self.rng.getrandbits(64),
+                                    # Arrivals come from neighbouring regions instead of being invented
+                                    spawn_rate=0.0)
+            simulation.emigrants = []
+            simulations.append(simulation)
+        self.delta_time = simulations[0].delta_time if simulations else 0.0
+
+        if parallel:
+            self.regions = [_ProcessRegion(simulation, (index + 1) * REGION_ID_BLOCK)
+                            for index, simulation in enumerate(simulations)]
+        else:
+            self.regions = [_LocalRegion(simulation) for simulation in simulations]
+
+        # Batched migration queues, delivered at the start of the next interval
+        self.inboxes = [[] for _ in self.regions]
+        self.region_counts = [count_states(simulation) for simulation in simulations]
+        self.departed = 0  # People who left the city through its outer border (open border only)
+
+    def region_index(self, column, row):
+        return row * self.columns + column
+
+    def advance(self, intervals=1):
+        """Run all regions concurrently for a number of synchronization intervals"""
+        for _ in range(intervals):
+            for region, inbox in zip(self.regions, self.inboxes):
+                region.send('sync', (inbox, self.sync_interval))
+            results = [region.receive() for region in self.regions]
+
+            self.inboxes = [[] for _ in self.regions]
+            for index, (emigrants, counts) in enumerate(results):
+                self.region_counts[index] = counts
+                column, row = index % self.columns, index // self.columns
+                for person, side in emigrants:
+                    d_column, d_row, entry_side = NEIGHBOURS[side]
+                    if 0 <= column + d_column < self.columns and 0 <= row + d_row < self.rows:
+                        self.inboxes[self.region_index(column + d_column, row + d_row)].append((person, entry_side))
+                    elif self.closed_border:
+                        # Bounce off the city's outer border back into the same region
+                        if d_column:
+                            person.velocity.x *= -1
+                        else:
+                            person.velocity.y *= -1
+                        self.inboxes[index].append((person, side))
+                    else:
+                        self.departed += 1
+            self.time += self.sync_interval * self.delta_time
+
+    def in_transit_counts(self):
+        """Return the counters of people waiting in the migration queues"""
+        counts = {HEALTHY_STATE: 0, INFECTED_STATE: 0, IMMUNE_STATE: 0}
+        for inbox in self.inboxes:
+            for person, _ in inbox:
+                counts[person.state.__class__.__name__] += 1
+        return counts
+
+    def counts(self):
+        """Return the population counters summed over all regions and the migration queues"""
+        total = self.in_transit_counts()
+        for counts in self.region_counts:
+            for state_name, count in counts.items():
+                total[state_name] += count
+        return total
+
+    def snapshot(self):
+        """Return every region's simulation in row-major order (copies when running in worker processes)"""
+        for region in self.regions:
+            region.send('snapshot')
+        return [region.receive() for region in self.regions]
+
+    def close(self):
+        """Stop the worker processes"""
+        for region in self.regions:
+            region.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
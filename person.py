@@ -8,10 +8,23 @@ from state.ImmuneState import ImmuneState
 from constants import HEALTHY_STATE, INFECTED_STATE, IMMUNE_STATE
 
 class Person:
+    MIN_SPEED = 0.5  # Minimum speed
     MAX_SPEED = 2.5  # Maximum speed
+    DIRECTION_CHANGE_INTERVAL = 1.0  # Seconds before a person may change direction
+    DIRECTION_CHANGE_CHANCE = 0.05  # Chance per update of changing direction after that
+    DISTANCING_DIRECTION_CHANGE_CHANCE = 0.1  # The same for people practicing distancing
+    MIN_INFECTION_DURATION = 20.0  # Shortest infection, in seconds
+    MAX_INFECTION_DURATION = 30.0  # Longest infection, in seconds
+    SYMPTOMATIC_CHANCE = 0.7  # Chance an infected person shows symptoms
     next_id = 0  # Class variable for unique IDs
+    # State objects hold no data, so all people share one instance of each
+    STATES = {
+        HEALTHY_STATE: HealthyState(),
+        INFECTED_STATE: InfectedState(),
+        IMMUNE_STATE: ImmuneState()
+    }
 
-    def __init__(self, position, initial_state=HEALTHY_STATE, velocity_direction=None):
+    def __init__(self, position, initial_state=HEALTHY_STATE, velocity_direction=None, rng=None):
         """
         Initialize a person with position and initial state.
         
@@ -19,14 +32,16 @@ class Person:
             position (Vector2D): The initial position
             initial_state (str): Initial health state
             velocity_direction (Vector2D): Optional direction for initial velocity
+            rng (random.Random): Random stream to draw from (defaults to the global one)
         """
+        self.rng = rng if rng is not None else random
         self.id = Person.next_id
         Person.next_id += 1
         self.position = position  # Vector2D position
         
         # Set velocity based on direction or random
         if velocity_direction:
-            speed = random.uniform(0.5, self.MAX_SPEED)
+            speed = self.rng.uniform(self.MIN_SPEED, self.MAX_SPEED)
             magnitude = math.sqrt(velocity_direction.x**2 + velocity_direction.y**2)
             if magnitude > 0:
                 # Normalize and scale by speed
@@ -40,22 +55,19 @@ class Person:
             self.velocity = self.random_velocity()
             
         self.time_close_to_others = {}  # Time spent close to other people (keys are IDs)
-        self.states = {
-            HEALTHY_STATE: HealthyState(),
-            INFECTED_STATE: InfectedState(),
-            IMMUNE_STATE: ImmuneState()
-        }
+        self.states = Person.STATES
         self.state = self.states[initial_state]  # Current state
         self.infection_time = 0.0  # Time since infection
         self.infection_duration = 0.0  # Duration of infection
         self.has_symptoms = False  # Whether the person has symptoms (only applies to infected state)
-        self.social_distancing = random.random() < 0.3  # 30% chance a person follows social distancing
+        self.social_distancing = self.rng.random() < 0.3  # 30% chance a person follows social distancing
         self.movement_timer = 0.0  # Timer for changing direction
+        self.contact_graph = None  # ContactGraph of the owning simulation, if it tracks contacts
 
     def random_velocity(self):
         """Generate a random velocity vector"""
-        angle = random.uniform(0, 360)
-        speed = random.uniform(0.5, self.MAX_SPEED)
+        angle = self.rng.uniform(0, 360)
+        speed = self.rng.uniform(self.MIN_SPEED, self.MAX_SPEED)
         rad = math.radians(angle)
         return Vector2D(speed * math.cos(rad), speed * math.sin(rad))
 
@@ -67,9 +79,10 @@ class Person:
 
         # Random velocity changes
         self.movement_timer += delta_time
-        change_direction_threshold = 0.1 if self.social_distancing else 0.05
+        change_direction_threshold = (self.DISTANCING_DIRECTION_CHANGE_CHANCE if self.social_distancing
+                                      else self.DIRECTION_CHANGE_CHANCE)
         
-        if self.movement_timer >= 1.0 and random.random() < change_direction_threshold:
+        if self.movement_timer >= self.DIRECTION_CHANGE_INTERVAL and self.rng.random() < change_direction_threshold:
             self.movement_timer = 0.0
             self.velocity = self.random_velocity()
             
@@ -93,7 +106,7 @@ class Person:
                         avg_dir_y /= len(nearby_people)
                         
                         # Set velocity in the direction away from others
-                        speed = random.uniform(0.5, self.MAX_SPEED)
+                        speed = self.rng.uniform(self.MIN_SPEED, self.MAX_SPEED)
                         magnitude = math.sqrt(avg_dir_x**2 + avg_dir_y**2)
                         if magnitude > 0:
                             self.velocity = Vector2D(
@@ -115,21 +128,37 @@ class Person:
     
     def change_state(self, new_state):
         """Change the state of the person and initialize state attributes"""
+        if self.contact_graph is not None:
+            # Exposures to or from this person end with its current state
+            self.contact_graph.end_contacts(self.id)
         if new_state == INFECTED_STATE:
             self.state = self.states[INFECTED_STATE]
             self.infection_time = 0.0
-            self.infection_duration = random.uniform(20.0, 30.0)  # 20-30 seconds infection
-            self.has_symptoms = random.random() < 0.7  # 70% chance of symptoms
+            self.infection_duration = self.rng.uniform(self.MIN_INFECTION_DURATION, self.MAX_INFECTION_DURATION)
+            self.has_symptoms = self.rng.random() < self.SYMPTOMATIC_CHANCE
+            if self.contact_graph is not None:
+                self.contact_graph.record_infection(self.id)
         else:
             self.state = self.states[new_state]
             self.has_symptoms = False  # Reset symptoms for other states
 
+    def clone(self):
+        """Return an independent copy of this person, much cheaper than a deepcopy"""
+        twin = object.__new__(Person)
+        twin.__dict__.update(self.__dict__)
+        twin.position = Vector2D(self.position.x, self.position.y)
+        twin.velocity = Vector2D(self.velocity.x, self.velocity.y)
+        twin.time_close_to_others = dict(self.time_close_to_others)
+        return twin
+
     def __getstate__(self):
         """Serialize person state"""
         state = self.__dict__.copy()
         state['state_name'] = self.state.__class__.__name__
         del state['state']
         del state['states']
+        del state['rng']
+        del state['contact_graph']
         state['time_close_to_others_ids'] = state['time_close_to_others']
         del state['time_close_to_others']
         return state
@@ -138,10 +167,8 @@ class Person:
         """Deserialize person state"""
         state_name = state.pop('state_name')
         self.__dict__.update(state)
-        self.states = {
-            HEALTHY_STATE: HealthyState(),
-            INFECTED_STATE: InfectedState(),
-            IMMUNE_STATE: ImmuneState()
-        }
+        self.rng = random  # The owning simulation re-attaches its own stream
+        self.contact_graph = None  # ...and its own contact graph
+        self.states = Person.STATES
         self.state = self.states[state_name]
         self.time_close_to_others = {}
\ No newline at end of file
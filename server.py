@@ -0,0 +1,334 @@
+# server.py
+import time
+import struct
+import asyncio
+import argparse
+from simulation import Simulation
+from helpers import count_states
+from constants import HEALTHY_STATE, INFECTED_STATE, IMMUNE_STATE
+
+# Wire format: every message is <length:uint32><kind:1 byte><body>, little-endian.
+MESSAGE_HEADER = struct.Struct('<IB')
+FRAME = 0x46  # 'F': delta-encoded frame
+REPLY = 0x52  # 'R': UTF-8 reply to a command
+
+# Frame body: header, then updated people, then IDs of people who are gone
+FRAME_HEADER = struct.Struct('<IdIIIBII')  # frame, time, healthy, infected, immune, paused, updates, removals
+PERSON_UPDATE = struct.Struct('<QffB')  # id, x, y, state code
+PERSON_REMOVAL = struct.Struct('<Q')
+
+# State codes sent to viewers
+HEALTHY, INFECTED_SYMPTOMATIC, INFECTED_ASYMPTOMATIC, IMMUNE = range(4)
+
+
+def state_code(person):
+    state_name = person.state.__class__.__name__
+    if state_name == INFECTED_STATE:
+        return INFECTED_SYMPTOMATIC if person.has_symptoms else INFECTED_ASYMPTOMATIC
+    return IMMUNE if state_name == IMMUNE_STATE else HEALTHY
+
+
+def encode_message(kind, body):
+    return MESSAGE_HEADER.pack(len(body) + 1, kind) + body
+
+
+def encode_frame(frame_number, simulation_time, counts, paused, snapshot, baseline):
+    """
+    Encode everything that changed between the baseline a viewer has and the snapshot.
+
+    Args:
+        counts (tuple): (healthy, infected, immune)
+        snapshot (dict): Person ID -> (x, y, state code) now
+        baseline (dict): Person ID -> (x, y, state code) the viewer last received
+
+    Returns:
+        bytes: Frame body
+    """
+    updates = [PERSON_UPDATE.pack(person_id, *values)
+               for person_id, values in snapshot.items() if baseline.get(person_id) != values]
+    removals = [PERSON_REMOVAL.pack(person_id) for person_id in baseline if person_id not in snapshot]
+    header = FRAME_HEADER.pack(frame_number, simulation_time, *counts, paused, len(updates), len(removals))
+    return b''.join([header] + updates + removals)
+
+
+def decode_frame(body):
+    """Decode a frame body into a dict with the counters, updates and removals"""
+    frame_number, simulation_time, healthy, infected, immune, paused, n_updates, n_removals = \
+        FRAME_HEADER.unpack_from(body)
+    offset = FRAME_HEADER.size
+    updates = {}
+    for _ in range(n_updates):
+        person_id, x, y, code = PERSON_UPDATE.unpack_from(body, offset)
+        updates[person_id] = (x, y, code)
+        offset += PERSON_UPDATE.size
+    removals = [PERSON_REMOVAL.unpack_from(body, offset + i * PERSON_REMOVAL.size)[0] for i in range(n_removals)]
+    return {
+        'frame': frame_number,
+        'time': simulation_time,
+        'counts': {'healthy': healthy, 'infected': infected, 'immune': immune},
+        'paused': bool(paused),
+        'updates': updates,
+        'removals': removals,
+    }
+
+
+async def read_message(reader):
+    """Read one (kind, body) message from a stream"""
+    length, kind = MESSAGE_HEADER.unpack(await reader.readexactly(MESSAGE_HEADER.size))
+    return kind, await reader.readexactly(length - 1)
+
+
+class _Subscriber:
+    """Connected viewer with its own baseline and frame budget"""
+
+    def __init__(self, writer, max_fps):
+        self.writer = writer
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.baseline = {}
+        self.replies = []
+        self.wakeup = asyncio.Event()
+
+
+#Serwer udostępniający działającą symulację przeglądarkom i klientom bez okna
+class SimulationServer:
+    def __init__(self, create_simulation, host='127.0.0.1', port=8765, max_client_fps=30, realtime=True):
+        """
+        Initialize the server.
+
+        Args:
+            create_simulation (callable): Returns a new Simulation (used at start and on reset)
+            host (str): Address to listen on
+            port (int): Port to listen on (0 picks a free one)
+            max_client_fps (float): Default frame limit for every viewer
+            realtime (bool): Step at the simulation's frame rate instead of as fast as possible
+        """
+        self.create_simulation = create_simulation
+        self.simulation = create_simulation()
+        self.host = host
+        self.port = port
+        self.max_client_fps = max_client_fps
+        self.realtime = realtime
+        self.paused = False
+        self.saved_states = []
+        self.frame_number = 0
+        self.subscribers = set()
+        self._client_tasks = set()
+        self._snapshot = None
+        self._snapshot_frame = -1
+        self._server = None
+        self._loop_task = None
+
+    async def start(self):
+        """Start listening and stepping the simulation"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._loop_task = asyncio.create_task(self._run_simulation())
+
+    async def stop(self):
+        """Stop the simulation loop and disconnect all viewers"""
+        self._loop_task.cancel()
+        self._server.close()
+        for subscriber in list(self.subscribers):
+            subscriber.writer.close()
+        await asyncio.gather(*self._client_tasks, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._loop_task
+        finally:
+            await self.stop()
+
+    def handle_command(self, command):
+        """Apply a command that mirrors the P/S/L/R keys of main.py and return the reply"""
+        command = command.strip().lower()
+        if command in ('p', 'pause'):
+            self.paused = not self.paused
+            self._publish()
+            return "paused" if self.paused else "running"
+        if command in ('s', 'save'):
+            if self.paused:
+                return "cannot save while paused"
+            self.saved_states.append(self.simulation.save_state())
+            return "saved"
+        if command in ('l', 'load'):
+            if self.paused:
+                return "cannot load while paused"
+            if not self.saved_states:
+                return "nothing to load"
+            self.simulation.restore_state(self.saved_states.pop())
+            self._publish()
+            return "loaded"
+        if command in ('r', 'reset'):
+            self.simulation = self.create_simulation()
+            self._publish()
+            return "reset"
+        return f"unknown command: {command}"
+
+    def snapshot(self):
+        """Return the positions and states of the current frame, built once per frame"""
+        if self._snapshot_frame != self.frame_number:
+            pack = PERSON_UPDATE.pack
+            snapshot = {}
+            for person in self.simulation.persons:
+                # Round through float32 so unchanged positions compare equal to what was sent
+                _, x, y, code = PERSON_UPDATE.unpack(pack(0, person.position.x, person.position.y, state_code(person)))
+                snapshot[person.id] = (x, y, code)
+            self._snapshot = snapshot
+            self._snapshot_frame = self.frame_number
+        return self._snapshot
+
+    def counts(self):
+        counts = count_states(self.simulation)
+        return counts[HEALTHY_STATE], counts[INFECTED_STATE], counts[IMMUNE_STATE]
+
+    def _publish(self):
+        self.frame_number += 1
+        for subscriber in self.subscribers:
+            subscriber.wakeup.set()
+
+    async def _run_simulation(self):
+        next_tick = time.perf_counter()
+        while True:
+            if not self.paused:
+                self.simulation.step()
+                self._publish()
+            if self.realtime:
+                next_tick = max(next_tick + self.simulation.delta_time, time.perf_counter() - 1.0)
+                await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+            else:
+                await asyncio.sleep(0)
+
+    async def _handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self._client_tasks.add(task)
+        subscriber = _Subscriber(writer, self.max_client_fps)
+        self.subscribers.add(subscriber)
+        sender = asyncio.create_task(self._send_frames(subscriber))
+        subscriber.wakeup.set()  # Send the first (full) frame right away
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('utf-8', 'replace').strip()
+                if command.lower().startswith('fps'):
+                    # Viewers may lower (or raise) their own frame budget
+                    try:
+                        fps = float(command.split()[1])
+                    except (ValueError, IndexError):
+                        reply = f"invalid frame rate: {command}"
+                    else:
+                        subscriber.min_interval = 1.0 / fps if fps > 0 else 0.0
+                        reply = f"fps {fps:g}"
+                else:
+                    reply = self.handle_command(command)
+                subscriber.replies.append(reply)
+                subscriber.wakeup.set()
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            self._client_tasks.discard(task)
+            sender.cancel()
+            writer.close()
+
+    async def _send_frames(self, subscriber):
+        """Send frames to one viewer; a slow viewer only skips frames, it never stalls the simulation"""
+        writer = subscriber.writer
+        last_sent = 0.0
+        sent_frame = -1
+        try:
+            while True:
+                await subscriber.wakeup.wait()
+                subscriber.wakeup.clear()
+
+                for reply in subscriber.replies:
+                    writer.write(encode_message(REPLY, reply.encode('utf-8')))
+                subscriber.replies.clear()
+
+                if sent_frame != self.frame_number:
+                    wait = last_sent + subscriber.min_interval - time.perf_counter()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    snapshot = self.snapshot()
+                    body = encode_frame(self.frame_number, self.simulation.time, self.counts(), self.paused,
+                                        snapshot, subscriber.baseline)
+                    writer.write(encode_message(FRAME, body))
+                    subscriber.baseline = snapshot
+                    sent_frame = self.frame_number
+                    last_sent = time.perf_counter()
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+
+class StreamClient:
+    """Minimal viewer that keeps a local copy of the streamed simulation"""
+
+    def __init__(self):
+        self.persons = {}  # Person ID -> (x, y, state code)
+        self.counts = {}
+        self.frame = None
+        self.time = 0.0
+        self.paused = False
+        self.replies = []
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, host='127.0.0.1', port=8765):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def send_command(self, command):
+        self.writer.write(command.encode('utf-8') + b'\n')
+        await self.writer.drain()
+
+    async def receive(self):
+        """Read one message, apply it and return its kind"""
+        kind, body = await read_message(self.reader)
+        if kind == FRAME:
+            frame = decode_frame(body)
+            self.persons.update(frame['updates'])
+            for person_id in frame['removals']:
+                del self.persons[person_id]
+            self.counts = frame['counts']
+            self.frame = frame['frame']
+            self.time = frame['time']
+            self.paused = frame['paused']
+        else:
+            self.replies.append(body.decode('utf-8'))
+        return kind
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a headless Disease Spread Simulation to local viewers.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=8765, help="port to listen on")
+    parser.add_argument('--fps', type=float, default=30, help="default frame limit per viewer")
+    parser.add_argument('--width', type=float, default=50, help="width of the simulation area")
+    parser.add_argument('--height', type=float, default=50, help="height of the simulation area")
+    parser.add_argument('--population', type=int, default=100, help="initial number of people")
+    parser.add_argument('--immune-rate', type=float, default=0.1, help="fraction of initially immune people")
+    parser.add_argument('--infected', type=int, default=5, help="number of initially infected people")
+    parser.add_argument('--seed', type=int, default=None, help="random seed")
+    args = parser.parse_args()
+
+    def create_simulation():
+        return Simulation(args.width, args.height, args.population, immune_rate=args.immune_rate,
+                          initial_infected=args.infected, seed=args.seed)
+
+    server = SimulationServer(create_simulation, host=args.host, port=args.port, max_client_fps=args.fps)
+    print(f"Serving on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
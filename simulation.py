@@ -1,13 +1,21 @@
 # simulation.py
+import math
 import random
 from person import Person
+from state.HealthyState import HealthyState
 from models.Vector2D import Vector2D
 from simulation_memento import SimulationMemento
+from contact_graph import ContactGraph
+from helpers import count_states, map_jobs
 from constants import HEALTHY_STATE, INFECTED_STATE, IMMUNE_STATE
 
 #Środowisko symulacji
 class Simulation:
-    def __init__(self, area_width, area_height, initial_population, immune_rate=0.0, initial_infected=0):
+    # Parameters that Simulation.fork accepts as per-branch overrides
+    FORK_OVERRIDES = ('spawn_rate', 'spawn_flux', 'max_population', 'social_distancing', 'immune_rate')
+
+    def __init__(self, area_width, area_height, initial_population, immune_rate=0.0, initial_infected=0, seed=None,
+                 max_population=300, spawn_rate=0.05, spawn_flux=None, track_contacts=False):
         """
         Initialize the simulation environment.
         
@@ -17,7 +25,15 @@ class Simulation:
             initial_population (int): Initial number of people in the simulation
             immune_rate (float): Percentage of initially immune people (0.0-1.0)
             initial_infected (int): Number of initially infected people
+            seed (int): Seed of this simulation's own random stream
+            max_population (int): Population above which nobody arrives (None for no limit)
+            spawn_rate (float): Chance for a single person to arrive per update
+            spawn_flux (float): Arrivals per unit of border length per second; when
+                set, arrivals are drawn in batches proportional to the perimeter
+                and spawn_rate is not used
+            track_contacts (bool): Record contacts and transmissions in a ContactGraph
         """
+        self.rng = random.Random(seed)
         self.area_width = area_width
         self.area_height = area_height
         self.persons = []  # List of people in the simulation
@@ -27,22 +43,38 @@ class Simulation:
         self.delta_time = 1.0 / self.frame_rate
         
         # Person spawn parameters
-        self.spawn_rate = 0.05  # Base chance for a new person to appear per update
-        self.max_population = 300  # Limit the population size
+        self.spawn_rate = spawn_rate  # Base chance for a new person to appear per update
+        self.spawn_flux = spawn_flux  # Arrivals per border length and second (None uses spawn_rate)
+        self.max_population = max_population  # Limit the population size (None for no limit)
+
+        # People leaving the area are collected here as (person, side) pairs
+        # when the simulation is part of a metapopulation; None discards them
+        self.emigrants = None
+
+        # Copy-on-write bookkeeping: a one-element list counting the simulations
+        # that still share the current Person objects (None when they are private)
+        self._shared_persons = None
+
+        # Contact/transmission graph, filled by HealthyState.interact when enabled
+        self.contact_graph = ContactGraph() if track_contacts else None
+
+        # Removals are deferred while update() runs (see _remove_person)
+        self._pending_removals = None
 
         # Initialize population
         for _ in range(initial_population):
-            position = Vector2D(random.uniform(0, area_width), random.uniform(0, area_height))
-            if random.random() < immune_rate:
+            position = Vector2D(self.rng.uniform(0, area_width), self.rng.uniform(0, area_height))
+            if self.rng.random() < immune_rate:
                 initial_state = IMMUNE_STATE
             else:
                 initial_state = HEALTHY_STATE
-            person = Person(position, initial_state=initial_state)
+            person = Person(position, initial_state=initial_state, rng=self.rng)
+            person.contact_graph = self.contact_graph
             self.persons.append(person)
             self.persons_by_id[person.id] = person
 
         # Randomly infect initial people
-        for person in random.sample(self.persons, min(initial_infected, len(self.persons))):
+        for person in self.rng.sample(self.persons, min(initial_infected, len(self.persons))):
             person.change_state(INFECTED_STATE)
 
     def run(self):
@@ -50,25 +82,102 @@ class Simulation:
             self.update()
             self.time += self.delta_time
 
+    def step(self, steps=1):
+        """Advance the simulation by a number of fixed time steps"""
+        for _ in range(steps):
+            self.update()
+            self.time += self.delta_time
+
     def update(self):
         """Update the simulation state for one time step"""
-        # Update each person's state
-        for person in self.persons[:]:  # Copy list to be able to remove people
-            person.move(self.delta_time)
-            person.update_state(self.delta_time)
+        self._materialize()
+        delta_time = self.delta_time
+        if self.contact_graph is not None:
+            self.contact_graph.time = self.time
+        cell_size = HealthyState.CONTACT_DISTANCE
+
+        # Only infected people can affect anyone, so a healthy person is checked
+        # against the infected people in neighbouring grid cells and those it
+        # still has an exposure timer running for. Checking them in list order
+        # keeps the interactions (and random draws) in the same order as
+        # checking everyone against everyone.
+        persons = self.persons[:]  # Copy list to be able to remove people
+        infected_at = {}  # List position -> infected person
+        infected_order = {}  # Person ID -> list position
+        infected_cells = {}  # Grid cell -> list positions of infected people in it
+        infected_cell_of = {}  # List position -> grid cell
 
-            # Check interactions with other people
-            for other_person in self.persons:
-                if other_person.id == person.id:
-                    continue  # Don't check interaction with self
-                person.interact(other_person, self.delta_time)
+        def add_infected(order, person):
+            cell = (int(person.position.x // cell_size), int(person.position.y // cell_size))
+            infected_at[order] = person
+            infected_order[person.id] = order
+            infected_cells.setdefault(cell, set()).add(order)
+            infected_cell_of[order] = cell
 
-            # Check area boundaries
-            self.check_bounds(person)
+        def remove_infected(order):
+            person = infected_at.pop(order)
+            del infected_order[person.id]
+            cell = infected_cell_of.pop(order)
+            infected_cells[cell].discard(order)
+            if not infected_cells[cell]:
+                del infected_cells[cell]
 
-        # Add new people occasionally if below max population
-        if len(self.persons) < self.max_population and random.random() < self.spawn_rate:
-            self.spawn_person()
+        for order, person in enumerate(persons):
+            if person.state.__class__.__name__ == INFECTED_STATE:
+                add_infected(order, person)
+
+        self._pending_removals = set()
+        try:
+            for order, person in enumerate(persons):
+                person.move(delta_time)
+                person.update_state(delta_time)
+
+                # Check interactions with infected people
+                if infected_at and person.state.__class__.__name__ == HEALTHY_STATE:
+                    cell_x = int(person.position.x // cell_size)
+                    cell_y = int(person.position.y // cell_size)
+                    nearby = set()
+                    for x in (cell_x - 1, cell_x, cell_x + 1):
+                        for y in (cell_y - 1, cell_y, cell_y + 1):
+                            nearby.update(infected_cells.get((x, y), ()))
+                    for other_id, exposure in person.time_close_to_others.items():
+                        if exposure and other_id in infected_order:
+                            nearby.add(infected_order[other_id])
+                    for other_order in sorted(nearby):
+                        person.interact(infected_at[other_order], delta_time)
+                        if person.state.__class__.__name__ != HEALTHY_STATE:
+                            break  # Nobody else can affect this person during this step
+
+                # Check area boundaries
+                self.check_bounds(person)
+
+                # Keep the infected index up to date for the people checked next
+                if order in infected_at:
+                    remove_infected(order)
+                if person.state.__class__.__name__ == INFECTED_STATE and person.id not in self._pending_removals:
+                    add_infected(order, person)
+
+            removed = self._pending_removals
+        finally:
+            self._pending_removals = None
+        if removed:
+            self.persons = [person for person in self.persons if person.id not in removed]
+
+        self.spawn_arrivals()
+
+    def spawn_arrivals(self):
+        """Add the people arriving during one time step, if below max population"""
+        room = math.inf if self.max_population is None else self.max_population - len(self.persons)
+        if room <= 0:
+            return
+        if self.spawn_flux is None:
+            if self.rng.random() < self.spawn_rate:
+                self.spawn_person()
+        else:
+            perimeter = 2 * (self.area_width + self.area_height)
+            arrivals = _poisson(self.rng, self.spawn_flux * perimeter * self.delta_time)
+            if arrivals:
+                self.spawn_people(min(arrivals, room))
 
     #Sprawdza czy osoba jest w obszarze symulacji
     def check_bounds(self, person):
@@ -88,7 +197,7 @@ class Simulation:
             out_of_bounds = True
 
         if out_of_bounds:
-            if random.random() < 0.7:  # 70% chance to bounce back
+            if self.rng.random() < 0.7:  # 70% chance to bounce back
                 # Reflect velocity to stay in bounds
                 if x < left or x > right:
                     person.velocity.x *= -1
@@ -100,33 +209,90 @@ class Simulation:
                 person.position.y = max(min(person.position.y, bottom), top)
             else:
                 # Remove person from simulation (30% chance)
-                self.persons.remove(person)
-                del self.persons_by_id[person.id]
+                self._remove_person(person)
+                if self.emigrants is not None:
+                    if x < left:
+                        side = 'left'
+                    elif x > right:
+                        side = 'right'
+                    elif y < top:
+                        side = 'top'
+                    else:
+                        side = 'bottom'
+                    self.emigrants.append((person, side))
 
-    def spawn_person(self):
-        """Generate a new person at the border of the simulation area"""
+    def _remove_person(self, person):
+        """Remove a person, deferring the list update to the end of update()"""
+        del self.persons_by_id[person.id]
+        if self.contact_graph is not None:
+            self.contact_graph.end_contacts(person.id)
+        if self._pending_removals is not None:
+            self._pending_removals.add(person.id)
+        else:
+            self.persons.remove(person)
+
+    def _border_person(self):
+        """Create a new person at the border of the simulation area"""
         # Random position on the border
-        side = random.choice(['left', 'right', 'top', 'bottom'])
+        side = self.rng.choice(['left', 'right', 'top', 'bottom'])
         if side == 'left':
-            position = Vector2D(0, random.uniform(0, self.area_height))
-            velocity_direction = Vector2D(1, random.uniform(-0.5, 0.5))
+            position = Vector2D(0, self.rng.uniform(0, self.area_height))
+            velocity_direction = Vector2D(1, self.rng.uniform(-0.5, 0.5))
         elif side == 'right':
-            position = Vector2D(self.area_width, random.uniform(0, self.area_height))
-            velocity_direction = Vector2D(-1, random.uniform(-0.5, 0.5))
+            position = Vector2D(self.area_width, self.rng.uniform(0, self.area_height))
+            velocity_direction = Vector2D(-1, self.rng.uniform(-0.5, 0.5))
         elif side == 'top':
-            position = Vector2D(random.uniform(0, self.area_width), 0)
-            velocity_direction = Vector2D(random.uniform(-0.5, 0.5), 1)
+            position = Vector2D(self.rng.uniform(0, self.area_width), 0)
+            velocity_direction = Vector2D(self.rng.uniform(-0.5, 0.5), 1)
         else:  # bottom
-            position = Vector2D(random.uniform(0, self.area_width), self.area_height)
-            velocity_direction = Vector2D(random.uniform(-0.5, 0.5), -1)
+            position = Vector2D(self.rng.uniform(0, self.area_width), self.area_height)
+            velocity_direction = Vector2D(self.rng.uniform(-0.5, 0.5), -1)
 
         # Create new person with velocity pointing inward
-        person = Person(position, velocity_direction=velocity_direction)
+        person = Person(position, velocity_direction=velocity_direction, rng=self.rng)
+        person.contact_graph = self.contact_graph
         
         # 10% chance of being infected when entering
-        if random.random() < 0.1:
+        if self.rng.random() < 0.1:
             person.change_state(INFECTED_STATE)
-            
+        return person
+
+    def spawn_person(self):
+        """Generate a new person at the border of the simulation area"""
+        self.spawn_people(1)
+
+    def spawn_people(self, count):
+        """Generate a batch of new people at the border of the simulation area"""
+        newcomers = [self._border_person() for _ in range(count)]
+        self.persons.extend(newcomers)
+        self.persons_by_id.update((person.id, person) for person in newcomers)
+
+    def admit_person(self, person, side):
+        """
+        Add a person arriving from a neighbouring area through one of the borders.
+
+        Args:
+            person (Person): The arriving person, keeping its state and velocity
+            side (str): Border the person enters through ('left', 'right', 'top' or 'bottom')
+        """
+        x = max(min(person.position.x, self.area_width), 0)
+        y = max(min(person.position.y, self.area_height), 0)
+        if side == 'left':
+            x = 0
+        elif side == 'right':
+            x = self.area_width
+        elif side == 'top':
+            y = 0
+        else:  # bottom
+            y = self.area_height
+        person.position = Vector2D(x, y)
+
+        # Exposure timers refer to people in the area that was left
+        person.time_close_to_others = {}
+        if hasattr(person, 'time_close_to_others_ids'):
+            del person.time_close_to_others_ids
+        self._attach(person)
+
         self.persons.append(person)
         self.persons_by_id[person.id] = person
 
@@ -136,17 +302,177 @@ class Simulation:
 
     def restore_state(self, memento):
         """Restore simulation state from a memento"""
-        self.persons = memento.state['persons']
+        self._adopt_persons(memento.state['persons'])
         self.time = memento.state['time']
+        # Forget the contacts and infections of the discarded future
+        if self.contact_graph is not None and memento.state.get('contact_graph') is not None:
+            self.contact_graph.rollback(memento.state['contact_graph'])
+
+    def _adopt_persons(self, persons):
+        """Take ownership of deserialized persons and relink their references"""
+        self.persons = persons
+        self._shared_persons = None
         # Reconstruct persons_by_id dictionary
         self.persons_by_id = {person.id: person for person in self.persons}
         # Reconstruct time_close_to_others for each person
         for person in self.persons:
+            self._attach(person)
             time_close_to_others_ids = getattr(person, 'time_close_to_others_ids', {})
             person.time_close_to_others = {}
             for other_id, time in time_close_to_others_ids.items():
                 if other_id in self.persons_by_id:
-                    other_person = self.persons_by_id[other_id]
                     person.time_close_to_others[other_id] = time
             if hasattr(person, 'time_close_to_others_ids'):
                 del person.time_close_to_others_ids
+        # Keep new IDs unique when persons were created in another process
+        if self.persons:
+            Person.next_id = max(Person.next_id, max(self.persons_by_id) + 1)
+
+    def fork(self, seed=None, **overrides):
+        """
+        Create a what-if branch that continues from the current state.
+
+        The branch shares the Person objects with this simulation until one of
+        them is stepped, so forking costs one list copy instead of a deep copy.
+
+        Args:
+            seed (int): Seed of the branch's own random stream
+            **overrides: Per-branch parameters, any of FORK_OVERRIDES.
+                social_distancing and immune_rate are fractions (0.0-1.0)
+                applied to the current population.
+
+        Returns:
+            Simulation: The new branch
+        """
+        unknown = set(overrides) - set(self.FORK_OVERRIDES)
+        if unknown:
+            raise ValueError(f"Unsupported fork overrides: {', '.join(sorted(unknown))}")
+
+        branch = object.__new__(Simulation)
+        branch.__dict__.update(self.__dict__)
+        branch.rng = random.Random(seed)
+        if self.contact_graph is not None:
+            branch.contact_graph = self.contact_graph.branch()
+        branch.persons = list(self.persons)
+        branch.persons_by_id = dict(self.persons_by_id)
+        branch.emigrants = [] if self.emigrants is not None else None
+        branch._pending_removals = None
+
+        if self._shared_persons is None:
+            self._shared_persons = [1]
+        self._shared_persons[0] += 1
+        branch._shared_persons = self._shared_persons
+
+        for name in ('spawn_rate', 'spawn_flux', 'max_population'):
+            if name in overrides:
+                setattr(branch, name, overrides[name])
+
+        if 'social_distancing' in overrides:
+            branch._materialize()
+            for person in branch.persons:
+                person.social_distancing = branch.rng.random() < overrides['social_distancing']
+
+        if 'immune_rate' in overrides:
+            branch._materialize()
+            for person in branch.persons:
+                if person.state.__class__.__name__ == HEALTHY_STATE and branch.rng.random() < overrides['immune_rate']:
+                    person.change_state(IMMUNE_STATE)
+
+        return branch
+
+    def _materialize(self):
+        """Copy shared Person objects before this simulation modifies them"""
+        if self._shared_persons is None:
+            return
+        if self._shared_persons[0] > 1:
+            self._shared_persons[0] -= 1
+            self.persons = [person.clone() for person in self.persons]
+            self.persons_by_id = {person.id: person for person in self.persons}
+        # The last holder of the shared persons takes them over as they are
+        for person in self.persons:
+            self._attach(person)
+        self._shared_persons = None
+
+    def _release(self):
+        """Give up the share of Person objects of a branch that is discarded unmodified"""
+        if self._shared_persons is not None:
+            self._shared_persons[0] -= 1
+            self._shared_persons = None
+
+    def _attach(self, person):
+        """Point a person at this simulation's random stream and contact graph"""
+        person.rng = self.rng
+        person.contact_graph = self.contact_graph
+
+    def __getstate__(self):
+        """Serialize the simulation, e.g. to step it in a worker process"""
+        state = self.__dict__.copy()
+        state['_shared_persons'] = None
+        del state['persons_by_id']
+        return state
+
+    def __setstate__(self, state):
+        """Deserialize the simulation and relink its persons"""
+        persons = state.pop('persons')
+        self.__dict__.update(state)
+        self._adopt_persons(persons)
+
+
+def _poisson(rng, mean):
+    """Draw a Poisson-distributed count from a random.Random stream"""
+    if mean <= 0:
+        return 0
+    if mean > 30:
+        # Normal approximation is accurate enough for large means
+        return max(0, round(rng.gauss(mean, math.sqrt(mean))))
+    limit = math.exp(-mean)
+    count = 0
+    product = rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+# Simulation every branch is forked from, set once per worker process
+_branch_parent = None
+
+
+def _set_branch_parent(simulation):
+    global _branch_parent
+    _branch_parent = simulation
+
+
+def _run_branch(args):
+    seed, overrides, steps, summarize = args
+    branch = _branch_parent.fork(seed=seed, **overrides)
+    branch.step(steps)
+    summary = summarize(branch)
+    branch._release()  # Lets the parent keep its people if the branch never copied them
+    return summary
+
+
+def step_branches(simulation, variants, steps, summarize=count_states, max_workers=None):
+    """
+    Fork a simulation into several branches, advance them and summarize each one.
+
+    The simulation is sent to every worker process once and the branches are
+    forked inside the workers, so only the summaries travel back.
+
+    Args:
+        simulation (Simulation): State all branches start from
+        variants (list): (seed, overrides) pairs, one per branch; see Simulation.fork
+        steps (int): Number of time steps for every branch
+        summarize (callable): Module-level function turning a stepped branch into
+            its result (defaults to the healthy/infected/immune counts)
+        max_workers (int): Worker processes to use; 0 runs the branches in this process
+
+    Returns:
+        list: The summaries, in the same order as the variants
+    """
+    jobs = [(seed, overrides, steps, summarize) for seed, overrides in variants]
+    try:
+        return map_jobs(_run_branch, jobs, max_workers, initializer=_set_branch_parent, initargs=(simulation,))
+    finally:
+        # With max_workers=0 the parent was set in this process; don't keep it alive
+        _set_branch_parent(None)
@@ -12,7 +12,8 @@ class SimulationMemento:
         """
         self.state = {
             'persons': copy.deepcopy(simulation.persons),
-            'time': simulation.time
+            'time': simulation.time,
+            'contact_graph': simulation.contact_graph.checkpoint() if simulation.contact_graph is not None else None
         }
         self.timestamp = datetime.datetime.now()
         self.statistics = {
@@ -1,9 +1,16 @@
 # state/HealthyState.py
 from .PersonState import PersonState
-import random
 from constants import INFECTED_STATE
 
 class HealthyState(PersonState):
+    CONTACT_DISTANCE = 2.0  # Distance within which an infected person is a risk
+    EXPOSURE_TIME = 3.0  # Seconds of close contact before infection is possible
+    DISTANCING_EXTRA_EXPOSURE = 2.0  # Additional seconds needed by people practicing distancing
+    SYMPTOMATIC_PROBABILITY = 0.8  # Infection chance next to a symptomatic carrier
+    ASYMPTOMATIC_PROBABILITY = 0.5  # Infection chance next to an asymptomatic carrier
+    DISTANCE_REDUCTION = 0.5  # Fraction of the chance lost at CONTACT_DISTANCE
+    DISTANCING_FACTOR = 0.7  # Chance multiplier for people practicing distancing
+
     def move(self, person, delta_time):
         person.default_move(delta_time)
 
@@ -20,38 +27,46 @@ class HealthyState(PersonState):
         other_id = other_person.id
 
         # Distance less than 2m
-        if distance <= 2.0:
+        if distance <= self.CONTACT_DISTANCE:
             # Initialize or increment time spent close to infected person
             if other_id not in person.time_close_to_others:
                 person.time_close_to_others[other_id] = 0.0
                 
             person.time_close_to_others[other_id] += delta_time
+            if person.contact_graph is not None:
+                person.contact_graph.open_contact(other_id, person.id, person.time_close_to_others[other_id])
             
             # Check for infection after 3 seconds of exposure
-            exposure_time = 3.0
+            exposure_time = self.EXPOSURE_TIME
             
             # Social distancing reduces chance of infection
             if person.social_distancing:
-                exposure_time += 2.0  # Need 5 seconds of exposure for people practicing distancing
+                exposure_time += self.DISTANCING_EXTRA_EXPOSURE  # Need 5 seconds of exposure for people practicing distancing
             
             if person.time_close_to_others[other_id] >= exposure_time:
                 # Probability calculation - symptoms increase infection chance
-                base_probability = 0.5 if not other_person.has_symptoms else 0.8
+                base_probability = self.ASYMPTOMATIC_PROBABILITY if not other_person.has_symptoms else self.SYMPTOMATIC_PROBABILITY
                 
                 # Adjust probability based on distance
-                distance_factor = 1.0 - (distance / 2.0) * 0.5  # 1.0 at 0m, 0.5 at 2m
+                distance_factor = 1.0 - (distance / self.CONTACT_DISTANCE) * self.DISTANCE_REDUCTION  # 1.0 at 0m, 0.5 at 2m
                 
                 # Social distancing reduces infection probability
                 if person.social_distancing:
-                    distance_factor *= 0.7
+                    distance_factor *= self.DISTANCING_FACTOR
                     
                 final_probability = base_probability * distance_factor
                 
                 # Check for infection
-                if random.random() < final_probability:
-                    person.change_state(INFECTED_STATE)
+                if person.rng.random() < final_probability:
+                    exposure = person.time_close_to_others[other_id]
                     person.time_close_to_others[other_id] = 0.0
+                    if person.contact_graph is not None:
+                        # Before change_state, which ends this person's other contacts
+                        person.contact_graph.record_transmission(other_id, person.id, distance, exposure)
+                    person.change_state(INFECTED_STATE)
         else:
             # Reset time if no longer close
             if other_id in person.time_close_to_others:
+                if person.contact_graph is not None and person.time_close_to_others[other_id] > 0:
+                    person.contact_graph.record_contact(other_id, person.id, person.time_close_to_others[other_id])
                 person.time_close_to_others[other_id] = 0.0
\ No newline at end of file
@@ -0,0 +1,378 @@
+# surrogate.py
+import math
+import numpy as np
+from person import Person
+from simulation import Simulation
+from state.HealthyState import HealthyState
+from helpers import count_states, map_jobs
+from constants import HEALTHY_STATE, INFECTED_STATE, IMMUNE_STATE
+
+# Parameters a scenario (or a screened parameter set) is described by
+SCENARIO_DEFAULTS = {
+    'area_width': 50.0,
+    'area_height': 50.0,
+    'population': 100,
+    'immune_rate': 0.1,
+    'initial_infected': 5,
+    'social_distancing': 0.3,
+}
+
+
+def _run_agent_curve(args):
+    """Run one agent simulation and sample its healthy/infected/immune fractions"""
+    scenario, seed, duration, sample_interval = args
+    simulation = Simulation(scenario['area_width'], scenario['area_height'], scenario['population'],
+                            immune_rate=scenario['immune_rate'],
+                            initial_infected=scenario['initial_infected'], seed=seed,
+                            spawn_rate=0.0)  # No arrivals, as in the surrogate
+    # People who cross the border are still removed, so the curves are fractions of
+    # the people present rather than of the initial population
+    for person in simulation.persons:
+        person.social_distancing = simulation.rng.random() < scenario['social_distancing']
+
+    steps_per_sample = max(1, round(sample_interval / simulation.delta_time))
+    samples = int(duration / sample_interval) + 1
+    curve = np.zeros((samples, 3))
+    for index in range(samples):
+        if index:
+            simulation.step(steps_per_sample)
+        counts = count_states(simulation)
+        total = max(len(simulation.persons), 1)
+        curve[index] = (counts[HEALTHY_STATE] / total, counts[INFECTED_STATE] / total,
+                        counts[IMMUNE_STATE] / total)
+    return curve
+
+
+def run_ensemble(scenario=None, seeds=range(8), duration=60.0, sample_interval=1.0, max_workers=None):
+    """
+    Run the agent model for several seeds and collect its epidemic curves.
+
+    Args:
+        scenario (dict): Overrides of SCENARIO_DEFAULTS
+        seeds (iterable): One agent run per seed
+        duration (float): Simulated time of each run in seconds
+        sample_interval (float): Time between samples in seconds
+        max_workers (int): Worker processes to use; 0 runs in this process
+
+    Returns:
+        dict: 'scenario', 'time' and 'curves' (runs x samples x [healthy, infected, immune] fractions)
+    """
+    scenario = dict(SCENARIO_DEFAULTS, **(scenario or {}))
+    jobs = [(scenario, seed, duration, sample_interval) for seed in seeds]
+    curves = map_jobs(_run_agent_curve, jobs, max_workers)
+    return {
+        'scenario': scenario,
+        'time': np.arange(curves[0].shape[0]) * sample_interval,
+        'curves': np.stack(curves),
+    }
+
+
+def contact_hazards(pairs=2000, duration=120.0, box_size=8.0, delta_time=1.0 / 60, seed=0):
+    """
+    Measure how often a healthy person is infected by one carrier sharing an area.
+
+    A contact only infects once it has lasted EXPOSURE_TIME; from then on the
+    infection chance is drawn again at every time step and a failed draw keeps
+    the timer running, so a contact that outlasts the threshold by n steps
+    infects with 1 - prod(1 - p * f) over those steps. This depends mostly on
+    how long contacts last, so pairs of people are moved exactly like
+    Person.default_move (straight lines with random changes of direction) in a
+    periodic box and the chance is accumulated over every contact they have.
+
+    Args:
+        pairs (int): Pairs simulated for every combination of distancing
+        duration (float): Simulated time per pair in seconds
+        box_size (float): Side of the periodic box the pairs move in
+        delta_time (float): Time step, as in Simulation
+        seed (int): Seed of the random stream
+
+    Returns:
+        array: Infections per second per unit of area, shaped
+        (exposed distancing, carrier distancing, carrier symptomatic)
+    """
+    rng = np.random.default_rng(seed)
+    radius = HealthyState.CONTACT_DISTANCE
+    # One row per pair, for every (exposed distancing, carrier distancing) combination
+    exposed_distancing = np.repeat([False, False, True, True], pairs)
+    carrier_distancing = np.repeat([False, True, False, True], pairs)
+    size = exposed_distancing.size
+    exposure_time = np.where(exposed_distancing, HealthyState.EXPOSURE_TIME + HealthyState.DISTANCING_EXTRA_EXPOSURE,
+                             HealthyState.EXPOSURE_TIME)
+    distancing_factor = np.where(exposed_distancing, HealthyState.DISTANCING_FACTOR, 1.0)
+    base_probability = np.array([HealthyState.ASYMPTOMATIC_PROBABILITY, HealthyState.SYMPTOMATIC_PROBABILITY])
+
+    def random_velocity(count):
+        angle = rng.uniform(0.0, 2.0 * math.pi, count)
+        speed = rng.uniform(Person.MIN_SPEED, Person.MAX_SPEED, count)
+        return np.stack([speed * np.cos(angle), speed * np.sin(angle)], axis=1)
+
+    change_chance = [np.where(distancing, Person.DISTANCING_DIRECTION_CHANGE_CHANCE, Person.DIRECTION_CHANGE_CHANCE)
+                     for distancing in (exposed_distancing, carrier_distancing)]
+    velocities = [random_velocity(size), random_velocity(size)]
+    movement_timers = [np.zeros(size), np.zeros(size)]
+    offset = rng.uniform(-box_size / 2, box_size / 2, (size, 2))  # Exposed minus carrier position
+    timer = np.zeros(size)  # Exposure timer of the exposed person
+    log_escape = np.zeros((size, 2))  # Log of the chance to escape the current contact, per carrier kind
+    infections = np.zeros((size, 2))
+
+    for _ in range(int(duration / delta_time)):
+        offset += (velocities[0] - velocities[1]) * delta_time
+        offset -= box_size * np.round(offset / box_size)
+        for person in range(2):
+            movement_timers[person] += delta_time
+            change = (movement_timers[person] >= Person.DIRECTION_CHANGE_INTERVAL) & \
+                (rng.random(size) < change_chance[person])
+            if change.any():
+                movement_timers[person][change] = 0.0
+                velocities[person][change] = random_velocity(int(change.sum()))
+
+        distance = np.hypot(offset[:, 0], offset[:, 1])
+        close = distance <= radius
+        # Contacts that just ended add their infection chance
+        ended = ~close & (timer > 0)
+        infections[ended] += 1.0 - np.exp(log_escape[ended])
+        log_escape[ended] = 0.0
+        timer = np.where(close, timer + delta_time, 0.0)
+        drawing = close & (timer >= exposure_time)
+        if drawing.any():
+            distance_factor = (1.0 - distance[drawing] / radius * HealthyState.DISTANCE_REDUCTION) * \
+                distancing_factor[drawing]
+            log_escape[drawing] += np.log1p(-base_probability * distance_factor[:, None])
+    infections += 1.0 - np.exp(log_escape)
+
+    # Mean over the pairs of each combination, scaled from the box to a unit of area
+    rates = infections.reshape(2, 2, pairs, 2).mean(axis=2) * box_size ** 2 / duration
+    return rates
+
+
+#Model kompartmentowy SIR z podziałem na zakażonych z objawami i bez
+class SurrogateModel:
+    # Infection course of Person.change_state
+    SYMPTOMATIC_FRACTION = Person.SYMPTOMATIC_CHANCE
+    MIN_INFECTION_DURATION = Person.MIN_INFECTION_DURATION
+    MAX_INFECTION_DURATION = Person.MAX_INFECTION_DURATION
+
+    _hazards = None  # Result of contact_hazards(), computed once per process
+
+    def __init__(self, contact_rate=1.0):
+        """
+        Initialize the surrogate.
+
+        Args:
+            contact_rate (float): Calibration factor on the contact hazards, which
+                leave out the area borders; the only fitted parameter
+        """
+        self.contact_rate = contact_rate
+
+    @classmethod
+    def hazards(cls):
+        if SurrogateModel._hazards is None:
+            SurrogateModel._hazards = contact_hazards()
+        return SurrogateModel._hazards
+
+    @property
+    def recovery_rate(self):
+        return 2.0 / (self.MIN_INFECTION_DURATION + self.MAX_INFECTION_DURATION)
+
+    def transmission_rates(self, social_distancing, density):
+        """
+        Derive the per-capita transmission rates of symptomatic and asymptomatic carriers.
+
+        Args:
+            social_distancing (array): Fraction of people practicing social distancing
+            density (array): People per unit of area
+
+        Returns:
+            tuple: (beta_symptomatic, beta_asymptomatic) arrays
+        """
+        social_distancing = np.asarray(social_distancing, dtype=float)
+        # Both the exposed person and the carrier practice distancing independently
+        weights = np.stack([1.0 - social_distancing, social_distancing])
+        hazard = np.einsum('e...,c...,eck->k...', weights, weights, self.hazards())
+        scale = self.contact_rate * np.asarray(density, dtype=float)
+        return scale * hazard[1], scale * hazard[0]
+
+    def _prepare(self, params):
+        params = {name: np.atleast_1d(np.asarray(params.get(name, default), dtype=float))
+                  for name, default in SCENARIO_DEFAULTS.items()}
+        size = max(len(values) for values in params.values())
+        params = {name: np.broadcast_to(values, (size,)) for name, values in params.items()}
+        density = params['population'] / (params['area_width'] * params['area_height'])
+        beta_s, beta_a = self.transmission_rates(params['social_distancing'], density)
+        infected = np.minimum(params['initial_infected'] / params['population'], 1.0)
+        immune = params['immune_rate'] * (1.0 - infected)
+        return params, beta_s, beta_a, infected, immune
+
+    def integrate(self, params, duration=60.0, dt=0.1, sample_interval=1.0):
+        """
+        Integrate the mean-field equations for many parameter sets at once (RK4).
+
+        Args:
+            params (dict): Scenario parameters; every value may be a scalar or an array
+            duration (float): Simulated time in seconds
+            dt (float): Integration step
+            sample_interval (float): Time between returned samples
+
+        Returns:
+            dict: 'time' and 'healthy', 'symptomatic', 'asymptomatic', 'immune'
+            fractions, each shaped (samples, parameter sets)
+        """
+        _, beta_s, beta_a, infected, immune = self._prepare(params)
+        gamma = self.recovery_rate
+        p = self.SYMPTOMATIC_FRACTION
+        y = np.stack([1.0 - infected - immune, infected * p, infected * (1.0 - p), immune])
+
+        def derivative(y):
+            s, i_s, i_a, _ = y
+            new_infections = s * (beta_s * i_s + beta_a * i_a)
+            return np.stack([
+                -new_infections,
+                p * new_infections - gamma * i_s,
+                (1.0 - p) * new_infections - gamma * i_a,
+                gamma * (i_s + i_a),
+            ])
+
+        steps_per_sample = max(1, round(sample_interval / dt))
+        samples = int(duration / sample_interval) + 1
+        out = np.empty((samples,) + y.shape)
+        out[0] = y
+        for index in range(1, samples):
+            for _ in range(steps_per_sample):
+                k1 = derivative(y)
+                k2 = derivative(y + 0.5 * dt * k1)
+                k3 = derivative(y + 0.5 * dt * k2)
+                k4 = derivative(y + dt * k3)
+                y = y + dt / 6.0 * (k1 + 2 * k2 + 2 * k3 + k4)
+            out[index] = y
+        return {
+            'time': np.arange(samples) * sample_interval,
+            'healthy': out[:, 0],
+            'symptomatic': out[:, 1],
+            'asymptomatic': out[:, 2],
+            'immune': out[:, 3],
+        }
+
+    def simulate(self, params, duration=60.0, dt=0.1, sample_interval=1.0, seed=None):
+        """
+        Run the stochastic (chain-binomial) version for many parameter sets at once.
+
+        Takes the same arguments as integrate plus a seed and returns the same
+        fractions, computed from whole numbers of people.
+        """
+        params, beta_s, beta_a, infected, immune = self._prepare(params)
+        rng = np.random.default_rng(seed)
+        population = np.round(params['population']).astype(np.int64)
+        i_total = np.round(infected * population).astype(np.int64)
+        i_s = rng.binomial(i_total, self.SYMPTOMATIC_FRACTION)
+        i_a = i_total - i_s
+        r = rng.binomial(population - i_total, immune / np.maximum(1.0 - infected, 1e-12))
+        s = population - i_total - r
+        p_recover = 1.0 - math.exp(-self.recovery_rate * dt)
+
+        steps_per_sample = max(1, round(sample_interval / dt))
+        samples = int(duration / sample_interval) + 1
+        out = np.empty((samples, 4, len(population)))
+        scale = np.maximum(population, 1)
+        out[0] = np.stack([s, i_s, i_a, r]) / scale
+        for index in range(1, samples):
+            for _ in range(steps_per_sample):
+                force = (beta_s * i_s + beta_a * i_a) / scale
+                new_infections = rng.binomial(s, 1.0 - np.exp(-force * dt))
+                new_symptomatic = rng.binomial(new_infections, self.SYMPTOMATIC_FRACTION)
+                recovered_s = rng.binomial(i_s, p_recover)
+                recovered_a = rng.binomial(i_a, p_recover)
+                s = s - new_infections
+                i_s = i_s + new_symptomatic - recovered_s
+                i_a = i_a + (new_infections - new_symptomatic) - recovered_a
+                r = r + recovered_s + recovered_a
+            out[index] = np.stack([s, i_s, i_a, r]) / scale
+        return {
+            'time': np.arange(samples) * sample_interval,
+            'healthy': out[:, 0],
+            'symptomatic': out[:, 1],
+            'asymptomatic': out[:, 2],
+            'immune': out[:, 3],
+        }
+
+    def error(self, ensemble):
+        """
+        Compare the surrogate with the mean curves of an agent ensemble.
+
+        Returns:
+            dict: RMSE of the infected and immune fractions, and absolute errors
+            of the infected peak, its time and the final immune fraction
+        """
+        time = ensemble['time']
+        duration = float(time[-1])
+        interval = float(time[1] - time[0]) if len(time) > 1 else 1.0
+        prediction = self.integrate(ensemble['scenario'], duration=duration, sample_interval=interval)
+        predicted_infected = (prediction['symptomatic'] + prediction['asymptomatic'])[:, 0]
+        predicted_immune = prediction['immune'][:, 0]
+        mean = ensemble['curves'].mean(axis=0)
+        infected, immune = mean[:, 1], mean[:, 2]
+        return {
+            'rmse_infected': float(np.sqrt(np.mean((predicted_infected - infected) ** 2))),
+            'rmse_immune': float(np.sqrt(np.mean((predicted_immune - immune) ** 2))),
+            'peak_error': float(abs(predicted_infected.max() - infected.max())),
+            'peak_time_error': float(abs(time[predicted_infected.argmax()] - time[infected.argmax()])),
+            'final_immune_error': float(abs(predicted_immune[-1] - immune[-1])),
+        }
+
+    @classmethod
+    def fit(cls, ensembles, bounds=(1e-2, 1e2), iterations=60):
+        """
+        Calibrate the contact rate to one or more agent ensembles.
+
+        Minimizes the summed squared error of the infected and immune fractions
+        with a golden-section search over the logarithm of the contact rate.
+
+        Args:
+            ensembles (list): Results of run_ensemble
+            bounds (tuple): Search interval of the contact rate
+
+        Returns:
+            SurrogateModel: The calibrated surrogate
+        """
+        if isinstance(ensembles, dict):
+            ensembles = [ensembles]
+
+        def loss(log_rate):
+            model = cls(math.exp(log_rate))
+            return sum(err['rmse_infected'] ** 2 + err['rmse_immune'] ** 2
+                       for err in (model.error(ensemble) for ensemble in ensembles))
+
+        ratio = (math.sqrt(5) - 1) / 2
+        low, high = math.log(bounds[0]), math.log(bounds[1])
+        a = high - ratio * (high - low)
+        b = low + ratio * (high - low)
+        loss_a, loss_b = loss(a), loss(b)
+        for _ in range(iterations):
+            if loss_a < loss_b:
+                high, b, loss_b = b, a, loss_a
+                a = high - ratio * (high - low)
+                loss_a = loss(a)
+            else:
+                low, a, loss_a = a, b, loss_b
+                b = low + ratio * (high - low)
+                loss_b = loss(b)
+        return cls(math.exp((low + high) / 2))
+
+    def screen(self, params, duration=60.0, top_k=10, metric='attack_rate'):
+        """
+        Rank many parameter sets by the surrogate so only the best get a full agent run.
+
+        Args:
+            params (dict): Scenario parameters as arrays of equal length
+            duration (float): Simulated time in seconds
+            top_k (int): Number of parameter sets to return
+            metric (str): 'attack_rate' (fraction of people infected during the run) or 'peak'
+
+        Returns:
+            tuple: (indices of the top_k sets with the lowest metric, metric for every set)
+        """
+        result = self.integrate(params, duration=duration)
+        if metric == 'peak':
+            values = (result['symptomatic'] + result['asymptomatic']).max(axis=0)
+        else:
+            values = result['healthy'][0] - result['healthy'][-1]
+        return np.argsort(values)[:top_k], values
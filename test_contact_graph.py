@@ -0,0 +1,59 @@
+# test_contact_graph.py
+import unittest
+from simulation import Simulation
+
+
+def scan(graph, person_id):
+    """contacts_of() computed by scanning the whole contact log"""
+    return sorted((graph._node_ids[target], duration, ended_at)
+                  for source, target, duration, ended_at
+                  in zip(graph._sources, graph._targets, graph._durations, graph._ended_at)
+                  if graph._node_ids[source] == person_id)
+
+
+class ContactGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation(40, 40, 150, immune_rate=0.1, initial_infected=10, seed=3,
+                                     track_contacts=True)
+        self.graph = self.simulation.contact_graph
+        self.graph.compact_threshold = 8
+
+    def assertIndexMatchesLog(self):
+        graph = self.graph
+        for person_id in list(graph._node_index):
+            self.assertEqual(sorted(graph.contacts_of(person_id)), scan(graph, person_id))
+
+    def test_contacts_of_matches_log(self):
+        for _ in range(6):
+            self.simulation.step(120)
+            self.assertIndexMatchesLog()
+        self.assertGreater(self.graph._compacted, 0)
+        self.assertTrue(self.graph.infector_of)
+
+    def test_restore_rolls_back_past_compaction(self):
+        self.simulation.step(240)
+        memento = self.simulation.save_state()
+        contacts = self.graph.contact_count()
+        infector_of = dict(self.graph.infector_of)
+        self.simulation.step(480)
+        self.assertGreater(self.graph._compacted, contacts)
+
+        self.simulation.restore_state(memento)
+        self.assertEqual(self.graph.contact_count(), contacts)
+        self.assertEqual(self.graph.infector_of, infector_of)
+        self.assertIndexMatchesLog()
+
+        # Recording continues consistently from the restored state
+        self.simulation.step(240)
+        self.assertIndexMatchesLog()
+
+    def test_branch_keeps_transmission_tree(self):
+        self.simulation.step(480)
+        branch = self.simulation.fork(seed=1)
+        self.assertEqual(branch.contact_graph.infector_of, self.graph.infector_of)
+        self.assertEqual(branch.contact_graph.secondary_cases, self.graph.secondary_cases)
+        self.assertEqual(branch.contact_graph.contact_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+# test_metapopulation.py
+import unittest
+from metapopulation import Metapopulation
+
+
+class MetapopulationTest(unittest.TestCase):
+    def assertConserved(self, city, total, intervals):
+        for _ in range(intervals):
+            city.advance()
+            self.assertEqual(sum(city.counts().values()) + city.departed, total)
+
+    def test_closed_border_keeps_everyone(self):
+        with Metapopulation(3, 3, 30, 30, 40, immune_rate=0.1, initial_infected=6,
+                            sync_interval=10, parallel=False, seed=1) as city:
+            self.assertConserved(city, 9 * 40, 30)
+            self.assertEqual(city.departed, 0)
+            # Everyone not in a migration queue is inside a region
+            in_regions = sum(len(simulation.persons) for simulation in city.snapshot())
+            self.assertEqual(in_regions + sum(city.in_transit_counts().values()), 9 * 40)
+
+    def test_open_border_counts_departed(self):
+        with Metapopulation(3, 3, 30, 30, 40, immune_rate=0.1, initial_infected=6,
+                            sync_interval=10, parallel=False, seed=1, closed_border=False) as city:
+            self.assertConserved(city, 9 * 40, 30)
+            self.assertGreater(city.departed, 0)
+
+    def test_worker_processes(self):
+        with Metapopulation(2, 2, 30, 30, 40, initial_infected=4, sync_interval=10, seed=2) as city:
+            self.assertConserved(city, 4 * 40, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
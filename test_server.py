@@ -0,0 +1,71 @@
+# test_server.py
+import time
+import asyncio
+import unittest
+from simulation import Simulation
+from server import SimulationServer, StreamClient, FRAME
+
+
+def create_simulation():
+    return Simulation(50, 50, 100, immune_rate=0.1, initial_infected=5, seed=1)
+
+
+class SimulationServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = SimulationServer(create_simulation, port=0, max_client_fps=10, realtime=False)
+        await self.server.start()
+        self.client = StreamClient()
+        await self.client.connect(port=self.server.port)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.stop()
+
+    async def command(self, command):
+        """Send a command and return its reply, applying the frames received meanwhile"""
+        replies = len(self.client.replies)
+        await self.client.send_command(command)
+        while len(self.client.replies) == replies:
+            await asyncio.wait_for(self.client.receive(), timeout=5)
+        return self.client.replies[-1]
+
+    async def test_frames_are_throttled(self):
+        frames = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < 1.0:
+            if await asyncio.wait_for(self.client.receive(), timeout=5) == FRAME:
+                frames += 1
+        # Without realtime the server steps as fast as it can, far above 10 frames per second
+        self.assertGreater(self.server.frame_number, 2 * frames)
+        self.assertLessEqual(frames, 10 + 2)
+
+    async def test_commands(self):
+        self.assertEqual(await self.command('p'), "paused")
+        self.assertEqual(await self.command('s'), "cannot save while paused")
+        self.assertEqual(await self.command('l'), "cannot load while paused")
+        self.assertEqual(await self.command('pause'), "running")
+        self.assertEqual(await self.command('l'), "nothing to load")
+        self.assertEqual(await self.command('s'), "saved")
+        self.assertEqual(await self.command('load'), "loaded")
+        self.assertEqual(await self.command('r'), "reset")
+        self.assertEqual(await self.command('x'), "unknown command: x")
+        self.assertEqual(await self.command('fps 5'), "fps 5")
+        self.assertEqual(await self.command('fps fast'), "invalid frame rate: fps fast")
+
+    async def test_client_matches_server_after_reset(self):
+        await self.command('fps 0')
+        await self.command('p')
+        old_ids = set(self.server.simulation.persons_by_id)
+        self.assertEqual(await self.command('reset'), "reset")
+
+        # Nothing steps while paused, so the frame after the reset is the last one
+        while self.client.frame != self.server.frame_number:
+            await asyncio.wait_for(self.client.receive(), timeout=5)
+        self.assertTrue(self.client.paused)
+        self.assertEqual(self.client.persons, self.server.snapshot())
+        self.assertFalse(old_ids & set(self.client.persons))
+        self.assertEqual(tuple(self.client.counts.values()), self.server.counts())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+# test_simulation.py
+import unittest
+import simulation as simulation_module
+from simulation import Simulation, step_branches
+
+
+def create_simulation():
+    return Simulation(50, 50, 100, immune_rate=0.1, initial_infected=5, seed=1)
+
+
+def signature(simulation):
+    """Everything a run determines apart from the global person IDs"""
+    persons = [(person.position.x, person.position.y, person.velocity.x, person.velocity.y,
+                person.state.__class__.__name__, person.has_symptoms, person.infection_time,
+                sorted(person.time_close_to_others.values()))
+               for person in simulation.persons]
+    return simulation.time, persons
+
+
+class ForkTest(unittest.TestCase):
+    def setUp(self):
+        self.simulation = create_simulation()
+        self.simulation.step(300)
+
+    def test_branch_does_not_change_parent(self):
+        before = signature(self.simulation)
+        branch = self.simulation.fork(seed=7, social_distancing=0.8, immune_rate=0.2)
+        branch.step(300)
+        self.assertEqual(signature(self.simulation), before)
+        self.assertNotEqual(signature(branch), before)
+
+        # The parent continues exactly like a simulation that was never forked
+        twin = create_simulation()
+        twin.step(300)
+        self.simulation.step(300)
+        twin.step(300)
+        self.assertEqual(signature(self.simulation), signature(twin))
+
+    def test_branches_with_same_seed_are_identical(self):
+        first = self.simulation.fork(seed=3, spawn_rate=0.5)
+        second = self.simulation.fork(seed=3, spawn_rate=0.5)
+        first.step(300)
+        second.step(300)
+        self.assertEqual(signature(first), signature(second))
+
+    def test_step_branches(self):
+        variants = [(seed, {'social_distancing': 0.5}) for seed in range(3)]
+        serial = step_branches(self.simulation, variants, 60, max_workers=0)
+        self.assertEqual(serial, step_branches(self.simulation, variants, 60, max_workers=2))
+        self.assertIsNone(simulation_module._branch_parent)
+
+    def test_unstepped_branches_release_parent(self):
+        step_branches(self.simulation, [(seed, {}) for seed in range(3)], 0, max_workers=0)
+        # Nobody else holds the parent's people, so stepping it copies nothing
+        people = {person.id: person for person in self.simulation.persons}
+        self.simulation.step()
+        self.assertTrue(all(people[person.id] is person
+                            for person in self.simulation.persons if person.id in people))
+
+
+if __name__ == "__main__":
+    unittest.main()